@@ -0,0 +1,58 @@
+import os
+import json
+import time
+
+DEFAULT_CHECKPOINT = "scan.checkpoint"
+VERSION = 1
+
+
+class ScanCheckpoint:
+    def __init__(self, path=DEFAULT_CHECKPOINT, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.last_save = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+        if state.get("version") != VERSION:
+            raise ValueError(f"Unsupported checkpoint file: {self.path}")
+        return state
+
+    def matches(self, directory_path):
+        # A checkpoint only applies to the directory it was taken for
+        try:
+            return self.load()["root"] == os.path.abspath(directory_path)
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def due(self):
+        return time.monotonic() - self.last_save >= self.interval
+
+    def save(self, root, frontier, query, found, scanned, extra=None):
+        state = {
+            "version": VERSION,
+            "root": root,
+            "frontier": sorted(frontier),
+            "query": query.to_dict(),
+            "found": found,
+            "scanned": scanned,
+            "saved_at": time.time(),
+        }
+        state.update(extra or {})
+
+        # Written to a temporary file first, so an interrupted save keeps the previous checkpoint
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self.last_save = time.monotonic()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
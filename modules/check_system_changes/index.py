@@ -0,0 +1,140 @@
+import os
+import time
+import sqlite3
+from scanner import ParallelScanner
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, parent TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, digest BLOB);
+"""
+
+
+class FileIndex:
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get_meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def root(self):
+        return self.get_meta("root")
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("DELETE FROM dirs")
+            self.connection.execute("DELETE FROM meta")
+
+    def load(self):
+        # Files are grouped by directory so an unlisted directory can reuse its indexed entries
+        files_by_dir = {}
+        for path, parent, size, mtime_ns, inode in self.connection.execute("SELECT path, parent, size, mtime_ns, inode FROM files"):
+            files_by_dir.setdefault(parent, {})[path] = (size, mtime_ns, inode)
+
+        dirs = {}
+        subdirs = {}
+        for path, parent, mtime_ns in self.connection.execute("SELECT path, parent, mtime_ns FROM dirs"):
+            dirs[path] = mtime_ns
+            if parent is not None:
+                subdirs.setdefault(parent, []).append(path)
+        return files_by_dir, dirs, subdirs
+
+    def scan(self, root, workers=None, skip_unchanged_dirs=False, onerror=None):
+        root = os.path.abspath(root)
+        indexed_root = self.root()
+        if indexed_root is not None and indexed_root != root:
+            raise ValueError(f"Index {self.index_path} was built for {indexed_root}, not {root}")
+
+        files_by_dir, indexed_dirs, indexed_subdirs = self.load()
+        dir_mtimes = {}
+
+        def visit(path):
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                return None  # Let the scanner report the error
+            dir_mtimes[path] = mtime_ns
+            # Adding, removing or renaming an entry changes the directory mtime, editing a file in place does not
+            if skip_unchanged_dirs and indexed_dirs.get(path) == mtime_ns:
+                return indexed_subdirs.get(path, [])
+            return None
+
+        changes = {"added": [], "modified": [], "deleted": []}
+        visited_dirs = {}
+
+        for dirpath, subdirs, files in ParallelScanner(workers, onerror, visit).scan(root):
+            indexed_files = files_by_dir.pop(dirpath, {})
+            if dirpath in dir_mtimes:
+                visited_dirs[dirpath] = dir_mtimes[dirpath]
+            if files is None:
+                continue  # Directory was not listed, its indexed files are assumed unchanged
+
+            for file_path, stat_result in files:
+                # DirEntry.stat() reports inode 0 on Windows, which still compares equal between runs
+                entry = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+                indexed = indexed_files.pop(file_path, None)
+                if indexed is None:
+                    changes["added"].append((file_path, entry))
+                elif indexed != entry:
+                    changes["modified"].append((file_path, entry))
+            changes["deleted"].extend(indexed_files)
+
+        # Files from directories that no longer exist
+        for indexed_files in files_by_dir.values():
+            changes["deleted"].extend(indexed_files)
+
+        changed_dirs = [(path, mtime_ns) for path, mtime_ns in visited_dirs.items() if indexed_dirs.get(path) != mtime_ns]
+        removed_dirs = [path for path in indexed_dirs if path not in visited_dirs]
+        return root, changes, changed_dirs, removed_dirs
+
+    def diff(self, root, workers=None, skip_unchanged_dirs=False, onerror=None):
+        if self.root() is None:
+            raise ValueError(f"Index {self.index_path} is empty, build it first")
+        return self.scan(root, workers, skip_unchanged_dirs, onerror)[1]
+
+    def update(self, root, workers=None, skip_unchanged_dirs=False, onerror=None):
+        root, changes, changed_dirs, removed_dirs = self.scan(root, workers, skip_unchanged_dirs, onerror)
+
+        # Only the differences are written, in a single transaction
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                ((path, os.path.dirname(path), *entry) for path, entry in changes["added"] + changes["modified"]))
+            self.connection.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in changes["deleted"]))
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                ((path, os.path.dirname(path) if path != root else None, mtime_ns) for path, mtime_ns in changed_dirs))
+            self.connection.executemany("DELETE FROM dirs WHERE path = ?", ((path,) for path in removed_dirs))
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (root,))
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('scanned_at', ?)", (str(time.time()),))
+        return changes
+
+    def load_hashes(self, root):
+        # Content hashes are kept per absolute path, so several roots can share one index
+        root = os.path.abspath(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        hashes = {}
+        for path, size, mtime_ns, inode, digest in self.connection.execute("SELECT path, size, mtime_ns, inode, digest FROM hashes"):
+            if path == root or path.startswith(prefix):
+                hashes[path] = ((size, mtime_ns, inode), digest)
+        return hashes
+
+    def store_hashes(self, entries, removed):
+        # entries: [(path, (size, mtime_ns, inode), digest)]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                ((path, *entry, digest) for path, entry, digest in entries))
+            self.connection.executemany("DELETE FROM hashes WHERE path = ?", ((path,) for path in removed))
+
+    def build(self, root, workers=None, onerror=None):
+        self.clear()
+        return self.update(root, workers, onerror=onerror)
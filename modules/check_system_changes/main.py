@@ -1,17 +1,32 @@
 import os
 import argparse
+import signal
 import threading
 import time
 from datetime import datetime
 from colorama import init, Fore, Style
 from tkinter import Tk, Label, Entry, Button, StringVar, filedialog, messagebox, Checkbutton
+from scanner import ParallelScanner, default_workers
+from index import FileIndex
+from watcher import create_watcher
+from query import ScanQuery, parse_moment, parse_size
+from sinks import create_sink, ProgressDisplay, OUTPUT_FORMATS
+from hasher import ContentHasher
+from checkpoint import ScanCheckpoint, DEFAULT_CHECKPOINT
+from stats import ScanStats
 
 class FileChecker:
-    def __init__(self):
+    def __init__(self, workers=None):
         init(autoreset=True)  # Initialize colorama
-        self.found_files = []
+        self.workers = workers or default_workers()
+        self.found_files = []  # Filled by watch mode
+        self.found_count = 0
         self.iteration = 0
         self.running = False
+        self.watcher = None
+        self.watch_stopped = None  # Event ending the current watch, set before its initial scan starts
+        self.scanner = None
+        self.stats = None  # ScanStats of the last scan, for other tooling
 
     def is_date_compatible(self, date1, date2):
         return date1 == date2
@@ -25,74 +40,122 @@ class FileChecker:
     def parse_time(self, time_str):
         return datetime.strptime(time_str, "%H:%M").time()
 
-    def check_changes(self, directory_path, target_date, target_time=None, output_file=None, debug=False, show_skipped=False):
-        self.found_files = []
+    def check_changes(self, directory_path, target_date=None, target_time=None, output_file=None, debug=False, show_skipped=False, query=None, output_format=None, checkpoint_path=None, resume=False, show_stats=False, stats_file=None, stats_top=10):
+        self.found_count = 0
+        self.stats = ScanStats(stats_top)
         self.running = True
+        sink = None
+        display = None
+        checkpoint = ScanCheckpoint(checkpoint_path) if checkpoint_path else None
+        # The checkpoint is keyed by the absolute path, the scan and the report use the path as given
+        root_path = os.path.abspath(directory_path)
+        pending = {directory_path}  # Directories whose results have not been processed yet
+        scanned = 0
+        # Ctrl+C stops the scan between two directories like the Stop button does, so a checkpoint
+        # never marks a directory as pending after some of its matches were already written
+        handle_interrupt = threading.current_thread() is threading.main_thread()
+        if handle_interrupt:
+            previous_handler = signal.signal(signal.SIGINT, self.interrupt)
         try:
+            frontier = None
+            output_state = None
+            if resume and checkpoint and checkpoint.exists():
+                # Continue from the saved frontier, with the query of the interrupted scan
+                state = checkpoint.load()
+                if state["root"] != root_path:
+                    raise ValueError(f"Checkpoint {checkpoint.path} belongs to {state['root']}")
+                query = ScanQuery.from_dict(state["query"])
+                frontier = [self.given_path(directory_path, root_path, path) for path in state["frontier"]]
+                pending = set(frontier)
+                self.found_count = state["found"]
+                scanned = state["scanned"]
+                # The output is cut back to where it ended at the checkpoint, so nothing is written twice
+                output_state = state.get("output")
+                if not output_file or not output_state or output_state["path"] != os.path.abspath(output_file):
+                    output_state = None
+
+            # Without an explicit query, match the given day (from the given time onwards)
+            if query is None:
+                if target_date is None:
+                    raise ValueError("Nothing to resume, give a date to check")
+                query = ScanQuery.for_date(target_date, target_time)
+
+            parameters = [("Path", directory_path)]
+            if target_date:
+                parameters.append(("Date", target_date))
+            if target_time:
+                parameters.append(("Time", target_time))
+            parameters += [("Query", query.describe()), ("Output", output_file), ("Debug", debug), ("Show Skipped", show_skipped)]
+
             # Print information about the File Changes Checker
             print(f"{Fore.CYAN}File Changes Checker{Style.RESET_ALL}")
             print("\nParameters:")
-            print(f"  {Fore.YELLOW}Path:{Style.RESET_ALL} {directory_path}")
-            print(f"  {Fore.YELLOW}Date:{Style.RESET_ALL} {target_date}")
-            if target_time:
-                print(f"  {Fore.YELLOW}Time:{Style.RESET_ALL} {target_time}")
-            print(f"  {Fore.YELLOW}Output:{Style.RESET_ALL} {output_file}")
-            print(f"  {Fore.YELLOW}Debug:{Style.RESET_ALL} {debug}")
-            print(f"  {Fore.YELLOW}Show Skipped:{Style.RESET_ALL} {show_skipped}\n")
+            for name, value in parameters:
+                print(f"  {Fore.YELLOW}{name}:{Style.RESET_ALL} {value}")
+            print(f"  {Fore.YELLOW}Workers:{Style.RESET_ALL} {self.workers}\n")
 
+            if frontier is not None:
+                print(f"{Fore.GREEN}Resuming: {len(frontier)} directories left, {scanned} files already scanned.{Style.RESET_ALL}")
             if debug:
                 print(f"{Fore.GREEN}Debug mode enabled. Working...{Style.RESET_ALL}")
 
-            # Traverse the directory and check for file changes
-            for root, dirs, files in os.walk(directory_path):
-                for file in files:
+            # Matches are streamed to the output file instead of being kept in memory
+            if output_file:
+                sink = create_sink(output_file, output_format, parameters, output_state)
+            display = ProgressDisplay()
+            found_color = Fore.LIGHTGREEN_EX if target_time else Fore.CYAN
+            time_color = Fore.LIGHTWHITE_EX if target_time else Fore.LIGHTCYAN_EX
+
+            # Traverse the directory in parallel and check for file changes
+            # Unreadable directories are skipped like in os.walk, and reported in debug mode
+            onerror = (lambda e: display.print(f"{Fore.RED}Cannot scan: {e}" + Style.RESET_ALL)) if debug else None
+            self.scanner = ParallelScanner(self.workers, onerror, descend=query.descend, stats=self.stats)
+            batches = self.scanner.scan(directory_path, frontier)
+            try:
+                for root, subdirs, files in batches:
+                    # Cancelling takes effect at the next directory, each directory is processed as a whole
                     if not self.running:
-                        break  # Stop the search if the user cancels
-                    file_path = os.path.join(root, file)
-                    last_modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-
-                    # Check if the file's date and time match the target
-                    if self.is_date_compatible(last_modified_time.date(), target_date):
-                        if target_time:
-                            target_datetime = datetime.combine(target_date, target_time)
-                            if self.is_date_time_compatible(last_modified_time, target_datetime):
-                                self.found_files.append((file_path, last_modified_time))
-                                # Display in real-time with different colors
-                                print(f"{Fore.GREEN}Found: {Fore.LIGHTGREEN_EX}{file_path} {Fore.LIGHTWHITE_EX}({last_modified_time})" + Style.RESET_ALL)
-                        else:
-                            self.found_files.append((file_path, last_modified_time))
+                        break
+
+                    for file_path, stat_result in files:
+                        # Check if the file matches the query, datetime is only built for reported files
+                        if query.matches(file_path, stat_result):
+                            last_modified_time = datetime.fromtimestamp(stat_result.st_mtime)
+                            self.found_count += 1
+                            if sink:
+                                sink.write(file_path, last_modified_time, stat_result.st_size)
                             # Display in real-time with different colors
-                            print(f"{Fore.GREEN}Found: {Fore.CYAN}{file_path} {Fore.LIGHTCYAN_EX}({last_modified_time})" + Style.RESET_ALL)
-                    elif show_skipped:
-                        print(f"{Fore.MAGENTA}Skipped: {Fore.LIGHTMAGENTA_EX}{file_path} {Fore.LIGHTWHITE_EX}(Last Modified: {last_modified_time})" + Style.RESET_ALL)
-
-                    # Display iteration in debug mode
-                    if debug:
-                        self.iteration += 1
-                        print(f"{Fore.CYAN}Scanned: {Fore.LIGHTBLUE_EX}{self.iteration}{Style.RESET_ALL}", end="\r")
+                            display.print(f"{Fore.GREEN}Found: {found_color}{file_path} {time_color}({last_modified_time})" + Style.RESET_ALL)
+                        elif show_skipped:
+                            last_modified_time = datetime.fromtimestamp(stat_result.st_mtime)
+                            display.print(f"{Fore.MAGENTA}Skipped: {Fore.LIGHTMAGENTA_EX}{file_path} {Fore.LIGHTWHITE_EX}(Last Modified: {last_modified_time})" + Style.RESET_ALL)
+
+                    pending.discard(root)
+                    pending.update(subdirs)
+                    scanned += len(files)
+                    self.iteration = scanned
+                    display.update(scanned, self.found_count)
+
+                    if checkpoint and checkpoint.due():
+                        self.save_checkpoint(checkpoint, sink, root_path, pending, query, scanned)
+            finally:
+                batches.close()
+                self.stats.finish()
+
+            display.close(scanned, self.found_count)
+            display = None
+            self.report_stats(show_stats, stats_file)
+
+            if not self.running or self.scanner.cancelled.is_set():
+                raise KeyboardInterrupt
+            if checkpoint:
+                checkpoint.remove()  # Nothing left to resume
 
             # Print results after checking changes
-            if self.found_files:
-                print("\nFound changes in the following files:")
-                for file_path, last_modified_time in self.found_files:
-                    print(f"{Fore.YELLOW}Found: {Fore.LIGHTYELLOW_EX}{file_path} {Fore.LIGHTWHITE_EX}({last_modified_time})" + Style.RESET_ALL)
-
-                # Save information to a file at the end
+            if self.found_count:
+                print(f"\n{Fore.YELLOW}Found changes in {Fore.LIGHTYELLOW_EX}{self.found_count}{Fore.YELLOW} files.{Style.RESET_ALL}")
                 if output_file:
-                    with open(output_file, "a") as file:
-                        file.write(f"\nParameters:\n")
-                        file.write(f"  Path: {directory_path}\n")
-                        file.write(f"  Date: {target_date}\n")
-                        if target_time:
-                            file.write(f"  Time: {target_time}\n")
-                        file.write(f"  Output: {output_file}\n")
-                        file.write(f"  Debug: {debug}\n")
-                        file.write(f"  Show Skipped: {show_skipped}\n\n")
-
-                        file.write("Found changes in the following files:\n")
-                        file.write("\n".join([f"Found: {file_path} ({last_modified_time})" for file_path, last_modified_time in self.found_files]))
-                        file.write("\n")
-
+                    print(f"{Fore.YELLOW}Saved to: {Fore.LIGHTYELLOW_EX}{output_file}{Style.RESET_ALL}")
             else:
                 print(Fore.BLUE + "\nNo changes found." + Style.RESET_ALL)
 
@@ -100,16 +163,257 @@ class FileChecker:
 
         except KeyboardInterrupt:
             print(Fore.YELLOW + "\nSearch canceled by the user." + Style.RESET_ALL)
+            if checkpoint and pending and query is not None:
+                self.save_checkpoint(checkpoint, sink, root_path, pending, query, scanned)
+                print(f"{Fore.YELLOW}Progress saved to {checkpoint.path}, run again with --resume to continue.{Style.RESET_ALL}")
+        except Exception as e:
+            print(Fore.RED + "An error occurred:", e, Style.RESET_ALL)
+        finally:
+            if handle_interrupt:
+                signal.signal(signal.SIGINT, previous_handler)
+            # Whatever was found before a cancel or an error is still written out
+            if display:
+                display.close(scanned, self.found_count)
+            if sink:
+                sink.close()
+            self.scanner = None
+            self.running = False
+
+    def report_stats(self, show_stats, stats_file=None):
+        if show_stats:
+            print()
+            for line in self.stats.report_lines():
+                print(f"{Fore.CYAN}{line}{Style.RESET_ALL}")
+        elif self.stats.errors:
+            # Unreadable directories and files are not silently ignored anymore
+            print(f"{Fore.RED}Errors: {sum(self.stats.errors.values())} entries could not be read, use --stats or --debug for details.{Style.RESET_ALL}")
+        if stats_file:
+            self.stats.save(stats_file)
+
+    def save_checkpoint(self, checkpoint, sink, root_path, pending, query, scanned):
+        # Results are flushed first, so the checkpoint never covers matches that are not on disk
+        if sink:
+            sink.flush()
+        frontier = [os.path.abspath(path) for path in pending]  # Valid from any working directory
+        checkpoint.save(root_path, frontier, query, self.found_count, scanned, {"output": sink.state()} if sink else None)
+
+    @staticmethod
+    def given_path(directory_path, root_path, path):
+        # Maps a saved absolute path back under the directory as the user gave it
+        relative = os.path.relpath(path, root_path)
+        return directory_path if relative == os.curdir else os.path.join(directory_path, relative)
+
+    def build_index(self, directory_path, index_path, debug=False):
+        self.run_index("build", directory_path, index_path, None, False, debug)
+
+    def diff_index(self, directory_path, index_path, output_file=None, skip_unchanged_dirs=False, debug=False):
+        return self.run_index("diff", directory_path, index_path, output_file, skip_unchanged_dirs, debug)
+
+    def update_index(self, directory_path, index_path, output_file=None, skip_unchanged_dirs=False, debug=False):
+        return self.run_index("update", directory_path, index_path, output_file, skip_unchanged_dirs, debug)
+
+    def run_index(self, action, directory_path, index_path, output_file, skip_unchanged_dirs, debug):
+        self.running = True
+        changes = None
+        try:
+            print(f"{Fore.CYAN}File Changes Checker - Index {action.capitalize()}{Style.RESET_ALL}")
+            print("\nParameters:")
+            print(f"  {Fore.YELLOW}Path:{Style.RESET_ALL} {directory_path}")
+            print(f"  {Fore.YELLOW}Index:{Style.RESET_ALL} {index_path}")
+            print(f"  {Fore.YELLOW}Skip Unchanged Dirs:{Style.RESET_ALL} {skip_unchanged_dirs}")
+            print(f"  {Fore.YELLOW}Workers:{Style.RESET_ALL} {self.workers}\n")
+
+            onerror = (lambda e: print(f"{Fore.RED}Cannot scan: {e}" + Style.RESET_ALL)) if debug else None
+            start_time = time.perf_counter()
+            index = FileIndex(index_path)
+            try:
+                if action == "build":
+                    changes = index.build(directory_path, self.workers, onerror)
+                elif action == "diff":
+                    changes = index.diff(directory_path, self.workers, skip_unchanged_dirs, onerror)
+                else:
+                    changes = index.update(directory_path, self.workers, skip_unchanged_dirs, onerror)
+            finally:
+                index.close()
+            elapsed = time.perf_counter() - start_time
+
+            if action == "build":
+                print(f"{Fore.GREEN}Indexed {Fore.LIGHTGREEN_EX}{len(changes['added'])}{Fore.GREEN} files in {elapsed:.2f}s." + Style.RESET_ALL)
+            else:
+                self.report_index_changes(directory_path, changes, output_file)
+                print(f"{Fore.MAGENTA}\nCompared with the index in {elapsed:.2f}s." + Style.RESET_ALL)
+
+        except KeyboardInterrupt:
+            print(Fore.YELLOW + "\nIndexing canceled by the user." + Style.RESET_ALL)
+        except Exception as e:
+            print(Fore.RED + "An error occurred:", e, Style.RESET_ALL)
+        finally:
+            self.running = False
+        return changes
+
+    def verify_content(self, directory_path, index_path, output_file=None, debug=False):
+        self.running = True
+        changes = None
+        try:
+            print(f"{Fore.CYAN}File Changes Checker - Content Verification{Style.RESET_ALL}")
+            print("\nParameters:")
+            print(f"  {Fore.YELLOW}Path:{Style.RESET_ALL} {directory_path}")
+            print(f"  {Fore.YELLOW}Index:{Style.RESET_ALL} {index_path}")
+            print(f"  {Fore.YELLOW}Workers:{Style.RESET_ALL} {self.workers}\n")
+
+            onerror = (lambda e: print(f"{Fore.RED}Cannot scan: {e}" + Style.RESET_ALL)) if debug else None
+            index = FileIndex(index_path)
+            try:
+                cached = index.load_hashes(directory_path)
+
+                # Only files whose size, mtime or inode differ from the cached entry are hashed
+                current = {}
+                to_hash = []
+                for root, subdirs, files in ParallelScanner(self.workers, onerror).scan(os.path.abspath(directory_path)):
+                    if not self.running:
+                        raise KeyboardInterrupt
+                    for file_path, stat_result in files:
+                        entry = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+                        current[file_path] = entry
+                        cached_entry = cached.get(file_path)
+                        if cached_entry is None or cached_entry[0] != entry:
+                            to_hash.append((file_path, stat_result.st_size))
+
+                print(f"{Fore.GREEN}Hashing {Fore.LIGHTGREEN_EX}{len(to_hash)}{Fore.GREEN} of {len(current)} files, the rest match the cache.{Style.RESET_ALL}")
+
+                changes = {"added": [], "modified": [], "deleted": []}
+                touched = 0
+                entries = []
+                hasher = ContentHasher()
+                for file_path, digest, size, error in hasher.hash_files(to_hash):
+                    if not self.running:
+                        raise KeyboardInterrupt
+                    if error:
+                        if debug:
+                            print(f"{Fore.RED}Cannot hash: {error}" + Style.RESET_ALL)
+                        continue
+                    entry = current[file_path]
+                    entries.append((file_path, entry, digest))
+                    cached_entry = cached.get(file_path)
+                    if cached_entry is None:
+                        changes["added"].append((file_path, entry))
+                    elif cached_entry[1] != digest:
+                        changes["modified"].append((file_path, entry))
+                    else:
+                        touched += 1  # New metadata, same content
+
+                changes["deleted"] = [file_path for file_path in cached if file_path not in current]
+                index.store_hashes(entries, changes["deleted"])
+            finally:
+                index.close()
+
+            if cached:
+                self.report_index_changes(directory_path, changes, output_file)
+            else:
+                print(f"{Fore.GREEN}No cached hashes yet, stored {len(entries)} for the next run.{Style.RESET_ALL}")
+            print(f"{Fore.CYAN}Metadata changed, content identical: {Fore.LIGHTCYAN_EX}{touched}{Style.RESET_ALL}")
+            print(f"{Fore.MAGENTA}\nHashed {hasher.files_hashed} files, {hasher.bytes_hashed / 1024 ** 2:.1f} MiB "
+                  f"in {hasher.elapsed:.2f}s ({hasher.throughput() / 1024 ** 2:.1f} MiB/s)." + Style.RESET_ALL)
+
+        except KeyboardInterrupt:
+            print(Fore.YELLOW + "\nVerification canceled by the user." + Style.RESET_ALL)
+        except Exception as e:
+            print(Fore.RED + "An error occurred:", e, Style.RESET_ALL)
+        finally:
+            self.running = False
+        return changes
+
+    def watch(self, directory_path, output_file=None, debounce=0.2, debug=False, stopped=None):
+        self.found_files = []
+        self.running = True
+        self.watch_stopped = stopped if stopped is not None else threading.Event()
+        try:
+            print(f"{Fore.CYAN}File Changes Checker - Watch Mode{Style.RESET_ALL}")
+            print("\nParameters:")
+            print(f"  {Fore.YELLOW}Path:{Style.RESET_ALL} {directory_path}")
+            print(f"  {Fore.YELLOW}Output:{Style.RESET_ALL} {output_file}")
+            print(f"  {Fore.YELLOW}Debounce:{Style.RESET_ALL} {debounce}s\n")
+
+            onerror = (lambda e: print(f"{Fore.RED}Watch error: {e}" + Style.RESET_ALL)) if debug else None
+            self.watcher = create_watcher(directory_path, debounce, self.workers, onerror, self.watch_stopped)
+            print(f"{Fore.GREEN}Watching with {type(self.watcher).__name__}. Press Ctrl+C to stop.{Style.RESET_ALL}")
+
+            # The output file stays open and every batch is flushed as soon as it arrives
+            output = open(output_file, "a") if output_file else None
+            try:
+                if output:
+                    output.write(f"\nWatching: {directory_path}\n")
+                    output.flush()
+
+                colors = {"added": Fore.GREEN, "modified": Fore.YELLOW, "deleted": Fore.RED}
+                for batch in self.watcher.batches():
+                    if not self.running:
+                        break
+                    detected_time = datetime.now()
+                    lines = []
+                    for file_path, kind in batch:
+                        self.found_files.append((file_path, detected_time))
+                        print(f"{colors[kind]}{kind.capitalize()}: {Fore.LIGHTWHITE_EX}{file_path} ({detected_time})" + Style.RESET_ALL)
+                        lines.append(f"{kind.capitalize()}: {file_path} ({detected_time})\n")
+                    if output:
+                        output.writelines(lines)
+                        output.flush()
+            finally:
+                if output:
+                    output.close()
+                self.watcher.close()
+
+            print(Fore.MAGENTA + "\nStopped watching." + Style.RESET_ALL)
+
+        except KeyboardInterrupt:
+            print(Fore.YELLOW + "\nWatching stopped by the user." + Style.RESET_ALL)
         except Exception as e:
             print(Fore.RED + "An error occurred:", e, Style.RESET_ALL)
         finally:
+            self.watcher = None
+            self.watch_stopped = None
             self.running = False
 
+    def stop(self):
+        self.running = False
+        if self.scanner:
+            self.scanner.cancel()
+        if self.watch_stopped:
+            self.watch_stopped.set()
+
+    def interrupt(self, signum, frame):
+        # A second Ctrl+C does not wait for the current directory anymore
+        if not self.running:
+            raise KeyboardInterrupt
+        self.stop()
+
+    def report_index_changes(self, directory_path, changes, output_file=None):
+        colors = {"added": Fore.GREEN, "modified": Fore.YELLOW, "deleted": Fore.RED}
+        lines = []
+        for kind, color in colors.items():
+            for change in changes[kind]:
+                if kind == "deleted":
+                    file_path, details = change, ""
+                else:
+                    file_path, (size, mtime_ns, inode) = change
+                    details = f" ({datetime.fromtimestamp(mtime_ns / 1e9)}, {size} bytes)"
+                print(f"{color}{kind.capitalize()}: {Fore.LIGHTWHITE_EX}{file_path}{details}" + Style.RESET_ALL)
+                lines.append(f"{kind.capitalize()}: {file_path}{details}")
+
+        if not lines:
+            print(Fore.BLUE + "No changes since the last scan." + Style.RESET_ALL)
+        elif output_file:
+            with open(output_file, "a") as file:
+                file.write(f"\nChanges since the last scan of {directory_path}:\n")
+                file.write("\n".join(lines))
+                file.write("\n")
+
 class GUI:
     def __init__(self, root, file_checker):
         self.root = root
         self.root.title("File Changes Checker")
         self.file_checker = file_checker
+        self.watch_stopped = None  # Set while a watch runs, from its start until its thread ends
 
         # GUI elements
         self.directory_label = Label(root, text="Directory Path:")
@@ -145,6 +449,12 @@ class GUI:
         self.check_button = Button(root, text="Check Changes", command=self.check_changes)
         self.check_button.pack()
 
+        self.stop_button = Button(root, text="Stop", command=self.file_checker.stop)
+        self.stop_button.pack()
+
+        self.watch_button = Button(root, text="Watch Changes", command=self.toggle_watch)
+        self.watch_button.pack()
+
     def check_changes(self):
         # Get input from GUI elements and initiate file checking
         directory_path = self.directory_entry.get()
@@ -159,7 +469,12 @@ class GUI:
 
             # Check if file checking is already in progress
             if not self.file_checker.running:
-                self.file_checker_thread = threading.Thread(target=self.file_checker.check_changes, args=(directory_path, target_date, target_time, output_file, False, show_skipped))
+                # An interrupted scan of the same directory can be continued
+                resume = False
+                if ScanCheckpoint(DEFAULT_CHECKPOINT).matches(directory_path):
+                    resume = messagebox.askyesno("Resume", "An interrupted scan of this directory was found. Resume it?")
+
+                self.file_checker_thread = threading.Thread(target=self.file_checker.check_changes, args=(directory_path, target_date, target_time, output_file, False, show_skipped, None, None, DEFAULT_CHECKPOINT, resume))
                 self.file_checker_thread.start()
                 self.root.after(100, self.check_thread_status)  # Check the thread status every 100 milliseconds
             else:
@@ -175,6 +490,40 @@ class GUI:
         else:
             messagebox.showinfo("Finished", "Finished checking changes.")
 
+    def toggle_watch(self):
+        # Start a live watch, or stop the running one
+        if self.watch_stopped is not None:
+            # Also works while the initial scan is still running
+            self.watch_stopped.set()
+            self.file_checker.stop()
+            self.watch_button.config(text="Stopping...")
+            return
+        if self.file_checker.running:
+            messagebox.showinfo("Info", "Checking changes is already in progress.")
+            return
+
+        directory_path = self.directory_entry.get()
+        output_file = self.output_entry.get()
+        if not os.path.isdir(directory_path):
+            messagebox.showerror("Error", f"Not a directory: {directory_path}")
+            return
+
+        self.watch_stopped = threading.Event()
+        self.file_checker_thread = threading.Thread(target=self.run_watch, args=(directory_path, output_file, self.watch_stopped), daemon=True)
+        self.file_checker_thread.start()
+        self.watch_button.config(text="Stop Watching")
+
+    def run_watch(self, directory_path, output_file, stopped):
+        try:
+            self.file_checker.watch(directory_path, output_file, stopped=stopped)
+        finally:
+            # The watch may also end on an error, the button is reset on the Tk thread either way
+            self.root.after(0, self.watch_finished)
+
+    def watch_finished(self):
+        self.watch_stopped = None
+        self.watch_button.config(text="Watch Changes")
+
 def print_help_and_exit():
     # Print help information and exit
     print(f"\n{Fore.LIGHTMAGENTA_EX}File Changes Checker{Style.RESET_ALL}\n")
@@ -185,8 +534,27 @@ def print_help_and_exit():
     print(f"{Fore.GREEN}--date{Style.RESET_ALL}         Date for checking changes (YYYY-MM-DD). {Fore.RED}(required){Style.RESET_ALL}")
     print(f"{Fore.GREEN}--time{Style.RESET_ALL}         Time for checking changes (HH:MM). {Fore.RED}(optional){Style.RESET_ALL}")
     print(f"{Fore.GREEN}--output{Style.RESET_ALL}       Path for the output file. {Fore.RED}(optional, default: output.txt){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--format{Style.RESET_ALL}       Output file format: text, jsonl or csv. {Fore.RED}(optional, default: from the file extension){Style.RESET_ALL}")
     print(f"{Fore.GREEN}--debug{Style.RESET_ALL}        Enable debug mode for additional information. {Fore.RED}(optional){Style.RESET_ALL}")
     print(f"{Fore.GREEN}--show-skipped{Style.RESET_ALL} Display files that were skipped during checking. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--workers{Style.RESET_ALL}      Number of threads scanning directories. {Fore.RED}(optional, default: CPU count + 4){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--since{Style.RESET_ALL}        Start of the modification range (YYYY-MM-DD [HH:MM]), instead of --date. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--until{Style.RESET_ALL}        End of the modification range, exclusive. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--min-size{Style.RESET_ALL}     Minimum file size, e.g. 10K or 5M. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--max-size{Style.RESET_ALL}     Maximum file size. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--include{Style.RESET_ALL}      File name patterns or extensions to match, e.g. *.py .log {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--exclude{Style.RESET_ALL}      Names to skip; matching directories are not scanned, e.g. .git node_modules {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--checkpoint{Style.RESET_ALL}   File where scan progress is saved every few seconds. {Fore.RED}(optional, default: scan.checkpoint){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--resume{Style.RESET_ALL}       Continue an interrupted scan from the checkpoint. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--stats{Style.RESET_ALL}        Show scan statistics and the slowest directories. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--stats-top{Style.RESET_ALL}    Number of slowest directories to report. {Fore.RED}(optional, default: 10){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--stats-file{Style.RESET_ALL}   Save scan statistics as JSON. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--index{Style.RESET_ALL}        Index action: build, diff or update. Date is not needed. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--index-file{Style.RESET_ALL}   Path for the index database. {Fore.RED}(optional, default: file_index.db){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--skip-unchanged-dirs{Style.RESET_ALL} Reuse the index for directories with an unchanged mtime. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--verify-content{Style.RESET_ALL} Detect content changes by hashing, using the hash cache in the index file. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--watch{Style.RESET_ALL}        Monitor the directory and report changes live. Date is not needed. {Fore.RED}(optional){Style.RESET_ALL}")
+    print(f"{Fore.GREEN}--debounce{Style.RESET_ALL}     Seconds of quiet before a batch of watch events is reported. {Fore.RED}(optional, default: 0.2){Style.RESET_ALL}")
     print(f"{Fore.GREEN}--gui{Style.RESET_ALL}          Run the program in GUI mode. {Fore.RED}(optional){Style.RESET_ALL}\n")
     print(f"{Fore.CYAN}Examples:{Style.RESET_ALL}")
     print(f"{Fore.GREEN}main.py{Style.RESET_ALL}", end=" ")
@@ -196,9 +564,26 @@ def print_help_and_exit():
     print(f"[{Fore.LIGHTBLUE_EX}--output{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<output_file>{Style.RESET_ALL}]", end=" ")
     print(f"[{Fore.LIGHTBLUE_EX}--debug{Style.RESET_ALL}]", end=" ")
     print(f"[{Fore.LIGHTBLUE_EX}--show-skipped{Style.RESET_ALL}]")
+    print(f"{Fore.GREEN}main.py{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--path{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<directory_path>{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--since{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<YYYY-MM-DD>{Style.RESET_ALL}", end=" ")
+    print(f"[{Fore.LIGHTBLUE_EX}--until{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<YYYY-MM-DD>{Style.RESET_ALL}]", end=" ")
+    print(f"[{Fore.LIGHTBLUE_EX}--include{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<pattern>...{Style.RESET_ALL}]", end=" ")
+    print(f"[{Fore.LIGHTBLUE_EX}--exclude{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<pattern>...{Style.RESET_ALL}]")
+    print(f"{Fore.GREEN}main.py{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--path{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<directory_path>{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--index{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<build|diff|update>{Style.RESET_ALL}", end=" ")
+    print(f"[{Fore.LIGHTBLUE_EX}--skip-unchanged-dirs{Style.RESET_ALL}]")
+    print(f"{Fore.GREEN}main.py{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--path{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<directory_path>{Style.RESET_ALL}", end=" ")
+    print(f"{Fore.LIGHTBLUE_EX}--watch{Style.RESET_ALL}")
     print(f"{Fore.GREEN}main.py {Fore.LIGHTBLUE_EX}--gui{Style.RESET_ALL}\n")
     print(f"{Fore.CYAN}Notes:{Style.RESET_ALL}")
     print("- In GUI mode, command-line options are not required.")
+    print("- An interrupted scan keeps its progress in the checkpoint file; --resume continues it with the original query.")
+    print("- --verify-content only hashes files whose size, mtime or inode changed since the cached hash.")
+    print("- Watch mode uses inotify on Linux and falls back to re-scanning every 2 seconds elsewhere.")
+    print("- --skip-unchanged-dirs is faster, but misses files modified in place, since that does not change the directory mtime.")
     print(f"- The default output file is {Fore.GREEN}'output.txt'{Style.RESET_ALL} if {Fore.GREEN}--output{Style.RESET_ALL} is not specified.")
     exit()
 
@@ -209,27 +594,75 @@ if __name__ == "__main__":
         parser.add_argument('--date', help='Date to check for changes (YYYY-MM-DD)')
         parser.add_argument('--time', help='Time to check for changes (HH:MM)')
         parser.add_argument('--output', help='Output file path')
+        parser.add_argument('--format', choices=OUTPUT_FORMATS, help='Output file format (default: from the file extension)')
         parser.add_argument('--debug', action='store_true', help='Enable debug mode')
         parser.add_argument('--show-skipped', action='store_true', help='Show skipped files during checking')
+        parser.add_argument('--workers', type=int, help='Number of threads scanning directories')
+        parser.add_argument('--since', help='Start of the modification range (YYYY-MM-DD [HH:MM])')
+        parser.add_argument('--until', help='End of the modification range, exclusive (YYYY-MM-DD [HH:MM])')
+        parser.add_argument('--min-size', help='Minimum file size, e.g. 10K or 5M')
+        parser.add_argument('--max-size', help='Maximum file size, e.g. 10K or 5M')
+        parser.add_argument('--include', nargs='+', help='File name patterns or extensions to match')
+        parser.add_argument('--exclude', nargs='+', help='File and directory names to skip')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='File where scan progress is saved')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted scan from the checkpoint')
+        parser.add_argument('--stats', action='store_true', help='Show scan statistics and the slowest directories')
+        parser.add_argument('--stats-top', type=int, default=10, help='Number of slowest directories to report')
+        parser.add_argument('--stats-file', help='Save scan statistics as JSON')
+        parser.add_argument('--index', choices=['build', 'diff', 'update'], help='Build, diff against or update the file index')
+        parser.add_argument('--index-file', default='file_index.db', help='Path to the index database')
+        parser.add_argument('--skip-unchanged-dirs', action='store_true', help='Do not list directories whose mtime matches the index')
+        parser.add_argument('--verify-content', action='store_true', help='Detect content changes by hashing files')
+        parser.add_argument('--watch', action='store_true', help='Monitor the directory and report changes live')
+        parser.add_argument('--debounce', type=float, default=0.2, help='Seconds of quiet before a batch of watch events is reported')
         parser.add_argument('--gui', action='store_true', help='Run in GUI mode')
         args = parser.parse_args()
 
         if args.gui:
             # Run in GUI mode
             root = Tk()
-            file_checker = FileChecker()
+            file_checker = FileChecker(args.workers)
             gui = GUI(root, file_checker)
             root.protocol("WM_DELETE_WINDOW", lambda: file_checker.running or root.destroy())
             root.resizable(False, False)
             root.mainloop()
         else:
             # Run in command-line mode
-            if args.path is None or args.date is None:
+            ranged = args.since is not None or args.until is not None
+            if args.path is None or (args.date is None and not ranged and not args.resume and args.index is None and not args.watch and not args.verify_content):
                 print_help_and_exit()
 
             output_file = args.output if args.output else "output.txt"
-            checker = FileChecker()
-            checker.check_changes(args.path, args.date, args.time, output_file, args.debug, args.show_skipped)
+            checker = FileChecker(args.workers)
+            if args.verify_content:
+                checker.verify_content(args.path, args.index_file, output_file, args.debug)
+            elif args.watch:
+                checker.watch(args.path, output_file, args.debounce, args.debug)
+            elif args.index == "build":
+                checker.build_index(args.path, args.index_file, args.debug)
+            elif args.index == "diff":
+                checker.diff_index(args.path, args.index_file, output_file, args.skip_unchanged_dirs, args.debug)
+            elif args.index == "update":
+                checker.update_index(args.path, args.index_file, output_file, args.skip_unchanged_dirs, args.debug)
+            else:
+                # Dates from the command line are parsed here, the checker works on date/time objects
+                target_date = checker.parse_date(args.date) if args.date else None
+                target_time = checker.parse_time(args.time) if args.time else None
+                filters = {
+                    "min_size": parse_size(args.min_size) if args.min_size else None,
+                    "max_size": parse_size(args.max_size) if args.max_size else None,
+                    "include": args.include,
+                    "exclude": args.exclude,
+                }
+                if ranged:
+                    start = parse_moment(args.since) if args.since else None
+                    end = parse_moment(args.until) if args.until else None
+                    query = ScanQuery(start, end, **filters)
+                elif target_date:
+                    query = ScanQuery.for_date(target_date, target_time, **filters)
+                else:
+                    query = None  # Taken from the checkpoint
+                checker.check_changes(args.path, target_date, target_time, output_file, args.debug, args.show_skipped, query, args.format, args.checkpoint, args.resume, args.stats, args.stats_file, args.stats_top)
 
     except Exception as e:
         print(Fore.RED + "An unexpected error occurred:", e, Style.RESET_ALL)
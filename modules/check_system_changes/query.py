@@ -0,0 +1,110 @@
+import os
+import re
+import fnmatch
+from datetime import datetime, timedelta
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def to_epoch_ns(moment):
+    # Exact integer nanoseconds for a naive local datetime, without going through a float
+    return int(moment.replace(microsecond=0).timestamp()) * 10 ** 9 + moment.microsecond * 1000
+
+
+def parse_size(size_str):
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)B?\s*", size_str.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size_str}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def parse_moment(moment_str):
+    # "YYYY-MM-DD" or "YYYY-MM-DD HH:MM"
+    for date_format in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(moment_str, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {moment_str} (expected YYYY-MM-DD or YYYY-MM-DD HH:MM)")
+
+
+def compile_patterns(patterns):
+    # One regex for all glob patterns; a bare extension like ".log" means "*.log"
+    if not patterns:
+        return None
+    globs = ["*" + pattern if pattern.startswith(".") and "*" not in pattern and pattern.count(".") == 1 else pattern for pattern in patterns]
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in globs), flags)
+
+
+class ScanQuery:
+    def __init__(self, start=None, end=None, min_size=None, max_size=None, include=None, exclude=None):
+        # Modification time range is [start, end), bounds are precomputed as epoch nanoseconds
+        self.start = start
+        self.end = end
+        self.start_ns = to_epoch_ns(start) if start else None
+        self.end_ns = to_epoch_ns(end) if end else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.include_regex = compile_patterns(self.include)
+        self.exclude_regex = compile_patterns(self.exclude)
+
+    @classmethod
+    def for_date(cls, target_date, target_time=None, **filters):
+        # Same result as the original exact-day match, optionally from a time of day onwards
+        start = datetime.combine(target_date, target_time) if target_time else datetime.combine(target_date, datetime.min.time())
+        end = datetime.combine(target_date + timedelta(days=1), datetime.min.time())
+        return cls(start, end, **filters)
+
+    def matches(self, file_path, stat_result):
+        # Integer comparisons only, no datetime objects per file
+        mtime_ns = stat_result.st_mtime_ns
+        if self.start_ns is not None and mtime_ns < self.start_ns:
+            return False
+        if self.end_ns is not None and mtime_ns >= self.end_ns:
+            return False
+        if self.min_size is not None and stat_result.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat_result.st_size > self.max_size:
+            return False
+        if self.include_regex or self.exclude_regex:
+            name = file_path.rpartition(os.sep)[2]
+            if self.include_regex and not self.include_regex.match(name):
+                return False
+            if self.exclude_regex and self.exclude_regex.match(name):
+                return False
+        return True
+
+    def descend(self, name):
+        # Excluded directories are pruned before they are listed
+        return self.exclude_regex is None or not self.exclude_regex.match(name)
+
+    def to_dict(self):
+        return {
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "include": self.include,
+            "exclude": self.exclude,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        start = datetime.fromisoformat(data["start"]) if data.get("start") else None
+        end = datetime.fromisoformat(data["end"]) if data.get("end") else None
+        return cls(start, end, data.get("min_size"), data.get("max_size"), data.get("include"), data.get("exclude"))
+
+    def describe(self):
+        parts = [f"modified in [{self.start or '-inf'}, {self.end or '+inf'})"]
+        if self.min_size is not None:
+            parts.append(f"size >= {self.min_size}")
+        if self.max_size is not None:
+            parts.append(f"size <= {self.max_size}")
+        if self.include:
+            parts.append(f"include {', '.join(self.include)}")
+        if self.exclude:
+            parts.append(f"exclude {', '.join(self.exclude)}")
+        return "; ".join(parts)
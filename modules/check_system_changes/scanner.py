@@ -0,0 +1,147 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+
+
+def default_workers():
+    # Scanning mostly waits on the file system, so use more threads than cores
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class ParallelScanner:
+    def __init__(self, workers=None, onerror=None, visit=None, descend=None, stats=None):
+        self.workers = workers or default_workers()
+        self.onerror = onerror
+        self.stats = stats  # Optional ScanStats collecting per-directory timings and errors
+        # visit(path) may return a list of subdirectories to queue instead of listing the directory
+        self.visit = visit
+        # descend(name) returning False prunes a subdirectory, like removing it from dirs in os.walk
+        self.descend = descend
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def scan(self, root, frontier=None):
+        # Yields (directory, [subdirectory paths to be scanned], [(file path, stat)]) in no particular order.
+        # Directories skipped by the visit hook are yielded with None instead of the file list.
+        # `frontier` resumes a scan from the directories that were still pending
+        self.cancelled.clear()
+        start = list(frontier) if frontier else [root]
+        self.queues = [deque() for _ in range(self.workers)]
+        for number, path in enumerate(start):
+            self.queues[number % self.workers].append(path)
+        self.pending = len(start)  # Directories queued or being listed
+        self.condition = threading.Condition()
+        self.results = queue.Queue(maxsize=self.workers * 64)
+
+        threads = [threading.Thread(target=self.worker, args=(index,), daemon=True) for index in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < self.workers:
+                batch = self.results.get()
+                if batch is None:
+                    finished += 1  # A worker has finished
+                    continue
+                yield batch
+        finally:
+            # Iteration stopped early - drain the results so blocked workers can exit
+            if finished < self.workers:
+                self.cancel()
+                with self.condition:
+                    self.condition.notify_all()
+                while finished < self.workers:
+                    if self.results.get() is None:
+                        finished += 1
+            for thread in threads:
+                thread.join()
+
+    def take(self, index):
+        own = self.queues[index]
+        while not self.cancelled.is_set():
+            # Own queue first (newest), then steal the oldest directories from the others
+            try:
+                return own.pop()
+            except IndexError:
+                pass
+            for offset in range(1, self.workers):
+                try:
+                    return self.queues[(index + offset) % self.workers].popleft()
+                except IndexError:
+                    pass
+
+            with self.condition:
+                if self.pending == 0:
+                    return None
+                if not any(self.queues):
+                    self.condition.wait()
+        return None
+
+    def worker(self, index):
+        try:
+            while True:
+                path = self.take(index)
+                if path is None:
+                    break
+
+                subdirs = self.visit(path) if self.visit else None
+                if subdirs is None:
+                    start_time = time.perf_counter()
+                    files, subdirs = self.list_directory(path)
+                    if subdirs is None:
+                        # Cancelled halfway: the directory is not reported, so it stays pending,
+                        # and idle workers are woken up to notice the cancel
+                        with self.condition:
+                            self.condition.notify_all()
+                        break
+                    if self.stats:
+                        self.stats.record_directory(path, len(files) + len(subdirs), len(files), time.perf_counter() - start_time)
+                else:
+                    files = None
+
+                # The result goes out before its subdirectories can be scanned, so consumers see parents first
+                self.results.put((path, subdirs, files))
+                self.queues[index].extend(subdirs)
+
+                with self.condition:
+                    self.pending += len(subdirs) - 1
+                    if subdirs or self.pending == 0:
+                        self.condition.notify_all()
+        finally:
+            self.results.put(None)
+
+    def list_directory(self, path):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    # Huge directories on slow mounts would otherwise delay a cancel until fully listed
+                    if self.cancelled.is_set():
+                        return None, None
+                    try:
+                        if entry.is_dir():
+                            if self.descend and not self.descend(entry.name):
+                                continue
+                            # Symlinked directories are not followed, same as os.walk
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            # DirEntry caches the stat result, no extra getmtime() call per file
+                            files.append((entry.path, entry.stat()))
+                    except OSError as e:
+                        self.report_error(e)
+        except OSError as e:
+            self.report_error(e)
+        return files, subdirs
+
+    def report_error(self, error):
+        if self.stats:
+            self.stats.record_error(error)
+        if self.onerror:
+            self.onerror(error)
@@ -0,0 +1,169 @@
+import os
+import sys
+import csv
+import json
+import time
+import threading
+
+# Results are written in large blocks instead of line by line
+BUFFER_SIZE = 1024 * 1024
+
+OUTPUT_FORMATS = ["text", "jsonl", "csv"]
+
+# Pending terminal lines are flushed early once there are this many
+MAX_PENDING_LINES = 1000
+
+
+def flush_to_disk(file):
+    # Used before a checkpoint, so saved progress never points past what is on disk
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def truncate_output(output_file, resume):
+    # Results written after the checkpoint are cut off, the resumed scan finds them again
+    if resume and os.path.exists(output_file) and os.path.getsize(output_file) > resume["offset"]:
+        os.truncate(output_file, resume["offset"])
+
+
+def file_size(output_file):
+    return os.path.getsize(output_file) if os.path.exists(output_file) else 0
+
+
+class TextSink:
+    def __init__(self, output_file, parameters, resume=None):
+        self.output_file = output_file
+        self.parameters = parameters
+        self.file = None
+        truncate_output(output_file, resume)
+        self.started = bool(resume and resume.get("started"))  # The header is already in the file
+        self.start_offset = file_size(output_file)
+
+    def open(self):
+        # Opened on the first result, so a scan without matches leaves the file untouched
+        self.file = open(self.output_file, "a", buffering=BUFFER_SIZE)
+        if not self.started:
+            self.file.write("\nParameters:\n")
+            for name, value in self.parameters:
+                self.file.write(f"  {name}: {value}\n")
+            self.file.write("\nFound changes in the following files:\n")
+            self.started = True
+
+    def write(self, file_path, last_modified_time, size):
+        if self.file is None:
+            self.open()
+        self.file.write(f"Found: {file_path} ({last_modified_time})\n")
+
+    def flush(self):
+        if self.file:
+            flush_to_disk(self.file)
+
+    def state(self):
+        # Where the output ends on disk, called right after flush() for a checkpoint
+        offset = os.fstat(self.file.fileno()).st_size if self.file else self.start_offset
+        return {"path": os.path.abspath(self.output_file), "offset": offset, "started": self.started}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class JsonLinesSink:
+    def __init__(self, output_file, parameters, resume=None):
+        self.output_file = output_file
+        truncate_output(output_file, resume)
+        self.file = open(output_file, "a", buffering=BUFFER_SIZE, encoding="utf-8")
+
+    def write(self, file_path, last_modified_time, size):
+        self.file.write(json.dumps({"path": file_path, "modified": last_modified_time.isoformat(), "size": size}))
+        self.file.write("\n")
+
+    def flush(self):
+        flush_to_disk(self.file)
+
+    def state(self):
+        return {"path": os.path.abspath(self.output_file), "offset": os.fstat(self.file.fileno()).st_size}
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+    def __init__(self, output_file, parameters, resume=None):
+        self.output_file = output_file
+        truncate_output(output_file, resume)
+        new_file = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+        self.file = open(output_file, "a", buffering=BUFFER_SIZE, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(["path", "modified", "size"])
+
+    def write(self, file_path, last_modified_time, size):
+        self.writer.writerow([file_path, last_modified_time.isoformat(), size])
+
+    def flush(self):
+        flush_to_disk(self.file)
+
+    def state(self):
+        return {"path": os.path.abspath(self.output_file), "offset": os.fstat(self.file.fileno()).st_size}
+
+    def close(self):
+        self.file.close()
+
+
+def create_sink(output_file, output_format=None, parameters=(), resume=None):
+    # The format follows the file extension unless given explicitly
+    if output_format is None:
+        extension = os.path.splitext(output_file)[1].lower()
+        output_format = {".jsonl": "jsonl", ".json": "jsonl", ".csv": "csv"}.get(extension, "text")
+
+    if output_format == "jsonl":
+        return JsonLinesSink(output_file, parameters, resume)
+    if output_format == "csv":
+        return CsvSink(output_file, parameters, resume)
+    return TextSink(output_file, parameters, resume)
+
+
+class ProgressDisplay:
+    def __init__(self, refresh_rate=10, stream=None):
+        self.interval = 1 / refresh_rate
+        self.stream = stream or sys.stdout
+        self.lines = []  # Printed together with the next redraw
+        self.lock = threading.Lock()  # Scanner threads may print errors
+        self.last_redraw = 0
+        self.start_time = time.perf_counter()
+        self.status = ""
+
+    def print(self, line):
+        with self.lock:
+            self.lines.append(line)
+            full = len(self.lines) >= MAX_PENDING_LINES
+        if full:
+            self.redraw()
+
+    def update(self, scanned, found):
+        now = time.perf_counter()
+        if now - self.last_redraw < self.interval:
+            return
+        elapsed = now - self.start_time
+        rate = scanned / elapsed if elapsed > 0 else 0
+        self.status = f"Scanned: {scanned}  Found: {found}  ({rate:.0f} files/s)"
+        self.redraw(now)
+
+    def redraw(self, now=None):
+        # One write per redraw: clear the status line, print pending lines, draw the status again
+        with self.lock:
+            lines, self.lines = self.lines, []
+        output = "\r\x1b[K"
+        if lines:
+            output += "\n".join(lines) + "\n"
+        self.stream.write(output + self.status)
+        self.stream.flush()
+        self.last_redraw = now or time.perf_counter()
+
+    def close(self, scanned, found):
+        self.last_redraw = 0
+        self.update(scanned, found)
+        self.stream.write("\n")
+        self.stream.flush()
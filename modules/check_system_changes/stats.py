@@ -0,0 +1,89 @@
+import json
+import time
+import heapq
+import threading
+from collections import Counter
+
+# Only this many error messages are kept, the rest are just counted
+MAX_ERROR_SAMPLES = 100
+
+
+class ScanStats:
+    def __init__(self, top=10):
+        self.top = top
+        self.lock = threading.Lock()  # Updated from every scanner thread
+
+        self.directories = 0
+        self.entries = 0
+        self.files = 0
+        self.list_time = 0.0  # Time spent in scandir and stat, summed over all threads
+        self.slowest = []  # Min-heap of (seconds, path, entries), bounded to `top` items
+        self.errors = Counter()
+        self.error_samples = []
+
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def record_directory(self, path, entries, files, duration):
+        with self.lock:
+            self.directories += 1
+            self.entries += entries
+            self.files += files
+            self.list_time += duration
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, (duration, path, entries))
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, path, entries))
+
+    def record_error(self, error):
+        with self.lock:
+            self.errors[type(error).__name__] += 1
+            if len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(str(error))
+
+    def finish(self):
+        self.end_time = time.perf_counter()
+
+    def elapsed(self):
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def files_per_second(self):
+        elapsed = self.elapsed()
+        return self.files / elapsed if elapsed > 0 else 0
+
+    def slowest_directories(self):
+        return sorted(self.slowest, reverse=True)
+
+    def as_dict(self):
+        return {
+            "elapsed": self.elapsed(),
+            "directories": self.directories,
+            "entries": self.entries,
+            "files": self.files,
+            "files_per_second": self.files_per_second(),
+            "list_time": self.list_time,
+            "latency_per_entry": self.list_time / self.entries if self.entries else 0,
+            "slowest_directories": [
+                {"path": path, "seconds": duration, "entries": entries, "latency_per_entry": duration / entries if entries else 0}
+                for duration, path, entries in self.slowest_directories()
+            ],
+            "errors": dict(self.errors),
+            "error_samples": list(self.error_samples),
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+    def report_lines(self):
+        lines = [
+            f"Scanned {self.files} files in {self.directories} directories in {self.elapsed():.2f}s ({self.files_per_second():.0f} files/s)",
+            f"Listing time: {self.list_time:.2f}s over all threads, {self.list_time / self.entries * 1e6 if self.entries else 0:.1f} us per entry",
+        ]
+        if self.slowest:
+            lines.append(f"Top {len(self.slowest)} slowest directories:")
+            for duration, path, entries in self.slowest_directories():
+                lines.append(f"  {duration * 1000:9.1f} ms  {entries:7} entries  {path}")
+        if self.errors:
+            lines.append("Errors: " + ", ".join(f"{name}: {count}" for name, count in self.errors.most_common()))
+        return lines
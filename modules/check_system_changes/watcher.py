@@ -0,0 +1,319 @@
+import os
+import sys
+import time
+import errno
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+from scanner import ParallelScanner
+
+# Constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+
+# struct inotify_event: wd, mask, cookie, len, followed by the name padded with zeros
+EVENT = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# How often a blocked watcher checks whether it was stopped
+STOP_CHECK_INTERVAL = 0.25
+
+
+def load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def merge_change(pending, path, kind):
+    # Collapse a burst of events for one path into a single change
+    previous = pending.get(path)
+    if previous == "added" and kind == "modified":
+        return
+    if previous == "added" and kind == "deleted":
+        del pending[path]  # Created and removed within one batch
+    elif previous == "deleted" and kind == "added":
+        pending[path] = "modified"  # Replaced, e.g. by an editor saving through a temporary file
+    else:
+        pending[path] = kind
+
+
+def stoppable_scanner(workers, onerror, stopped, visit=None):
+    # Gives up as soon as the watcher is stopped, also during the initial scan of a large tree
+    def checked_visit(directory):
+        if stopped.is_set():
+            scanner.cancel()
+            return []
+        return visit(directory) if visit else None
+
+    scanner = ParallelScanner(workers, onerror, checked_visit)
+    return scanner
+
+
+def file_entry(stat_result):
+    return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+
+
+def path_entry(path):
+    try:
+        return file_entry(os.stat(path))
+    except OSError:
+        return None
+
+
+class InotifyWatcher:
+    def __init__(self, root, debounce=0.2, max_delay=1.0, workers=None, onerror=None, stopped=None):
+        self.libc = load_libc()
+        if self.libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.root = os.path.abspath(root)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.workers = workers
+        self.onerror = onerror
+        self.stopped = stopped if stopped is not None else threading.Event()
+
+        self.paths = {}  # Watch descriptor -> directory
+        self.watches = {}  # Directory -> watch descriptor
+        self.known = {}  # Directory -> {file name: (size, mtime_ns, inode)}, to report the files of a removed subtree
+        self.limit_reached = False
+        try:
+            for _ in self.add_tree(self.root):
+                pass
+        except Exception:
+            self.close()
+            raise
+        if self.limit_reached:
+            # A partially watched tree would silently miss changes
+            self.close()
+            raise OSError(errno.ENOSPC, "inotify watch limit reached, raise fs.inotify.max_user_watches")
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # Runs inside scanner threads, so errors are reported instead of raised
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                self.limit_reached = True
+            if self.onerror:
+                self.onerror(OSError(error, os.strerror(error), path))
+            return
+        self.paths[wd] = path
+        self.watches[path] = wd
+
+    def scan_tree(self, path):
+        # The watch is added before the directory is listed, so nothing created in between is missed
+        def visit(directory):
+            self.add_watch(directory)
+            return None
+
+        tree = {}
+        for directory, _, files in stoppable_scanner(self.workers, self.onerror, self.stopped, visit).scan(path):
+            tree[directory] = {os.path.basename(file_path): file_entry(stat_result) for file_path, stat_result in files or ()}
+        return tree
+
+    def add_tree(self, path):
+        tree = self.scan_tree(path)
+        self.known.update(tree)
+        for directory, files in tree.items():
+            for name in files:
+                yield os.path.join(directory, name)
+
+    def remove_tree(self, path):
+        # Drops the watches below path and returns the files that were known there
+        prefix = path + os.sep
+        removed = []
+        for directory in [directory for directory in self.known if directory == path or directory.startswith(prefix)]:
+            removed.extend(os.path.join(directory, name) for name in self.known.pop(directory))
+        for directory in [directory for directory in self.watches if directory == path or directory.startswith(prefix)]:
+            wd = self.watches.pop(directory)
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+        return removed
+
+    def resync(self, pending):
+        # The kernel dropped events: rescan the whole tree and compare it with what was known
+        if self.onerror:
+            self.onerror(OSError(errno.EOVERFLOW, "inotify event queue overflowed, rescanning", self.root))
+        tree = self.scan_tree(self.root)
+        for directory, files in tree.items():
+            previous = self.known.get(directory, {})
+            for name, entry in files.items():
+                if name not in previous:
+                    merge_change(pending, os.path.join(directory, name), "added")
+                elif previous[name] != entry:
+                    merge_change(pending, os.path.join(directory, name), "modified")
+        for directory, files in self.known.items():
+            current = tree.get(directory, {})
+            for name in files:
+                if name not in current:
+                    merge_change(pending, os.path.join(directory, name), "deleted")
+
+        for directory in [directory for directory in self.watches if directory not in tree]:
+            wd = self.watches.pop(directory)
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+        self.known = tree
+
+    def read_events(self, pending):
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+                name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+                offset += EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                if mask & IN_IGNORED:
+                    path = self.paths.pop(wd, None)
+                    if path is not None and self.watches.get(path) == wd:
+                        del self.watches[path]
+                        self.known.pop(path, None)
+                    continue
+
+                directory = self.paths.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # New subtree - watch it and report the files already inside
+                        for file_path in self.add_tree(path):
+                            merge_change(pending, file_path, "added")
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        # Moved out of the tree or elsewhere inside it: its files are gone from here
+                        for file_path in self.remove_tree(path):
+                            merge_change(pending, file_path, "deleted")
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self.known.setdefault(directory, {})[os.path.basename(path)] = path_entry(path)
+                    merge_change(pending, path, "added")
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.known.get(directory, {}).pop(os.path.basename(path), None)
+                    merge_change(pending, path, "deleted")
+                elif mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+                    self.known.setdefault(directory, {})[os.path.basename(path)] = path_entry(path)
+                    merge_change(pending, path, "modified")
+
+        if overflowed:
+            self.resync(pending)
+
+    def batches(self):
+        # Yields lists of (path, kind) once events stop arriving for `debounce` seconds,
+        # or at the latest `max_delay` seconds after the first event of a burst
+        pending = {}
+        first_event = last_event = None
+
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            timeout = STOP_CHECK_INTERVAL
+            if pending:
+                timeout = max(0, min(last_event + self.debounce, first_event + self.max_delay) - now)
+
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            now = time.monotonic()
+            if readable:
+                count = len(pending)
+                self.read_events(pending)
+                if pending:
+                    first_event = first_event if count else now
+                    last_event = now
+
+            if pending and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                yield list(pending.items())
+                pending = {}
+
+    def stop(self):
+        self.stopped.set()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    def __init__(self, root, interval=2.0, workers=None, onerror=None, stopped=None):
+        self.root = os.path.abspath(root)
+        self.interval = interval
+        self.workers = workers
+        self.onerror = onerror
+        self.stopped = stopped if stopped is not None else threading.Event()
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        for _, _, files in stoppable_scanner(self.workers, self.onerror, self.stopped).scan(self.root):
+            for file_path, stat_result in files or ():
+                snapshot[file_path] = file_entry(stat_result)
+        return snapshot
+
+    def batches(self):
+        # Without inotify the tree has to be re-scanned on every poll
+        while not self.stopped.wait(self.interval):
+            snapshot = self.take_snapshot()
+            changes = []
+            for file_path, entry in snapshot.items():
+                previous = self.snapshot.get(file_path)
+                if previous is None:
+                    changes.append((file_path, "added"))
+                elif previous != entry:
+                    changes.append((file_path, "modified"))
+            changes.extend((file_path, "deleted") for file_path in self.snapshot if file_path not in snapshot)
+            self.snapshot = snapshot
+
+            if changes:
+                yield changes
+
+    def stop(self):
+        self.stopped.set()
+
+    def close(self):
+        self.snapshot = {}
+
+
+def create_watcher(root, debounce=0.2, workers=None, onerror=None, stopped=None):
+    # Setting `stopped` ends the watcher, including its initial scan
+    try:
+        return InotifyWatcher(root, debounce, workers=workers, onerror=onerror, stopped=stopped)
+    except OSError as e:
+        if onerror:
+            onerror(e)
+        return PollingWatcher(root, workers=workers, onerror=onerror, stopped=stopped)
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+from renderer import create_renderer, palettes, GLYPH_MODES, COLOR_DEPTHS
+from geometry import FrameGeometry
+
+# Rodzaj wyjścia: pełne klatki albo tylko zmienione komórki
+OUTPUTS = {
+    "full": False,
+    "delta": True,
+}
+
+DEFAULT_SIZES = ["80x24", "120x40", "200x60"]
+
+
+def synthetic_frames(count, width=640, height=360):
+    # Przesuwający się gradient z szumem - część komórek zmienia się w każdej klatce
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    for number in range(count):
+        shift = number * 4
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = (x + shift) % 256
+        frame[:, :, 1] = (y + shift) % 256
+        frame[:, :, 2] = ((x + y) / 2 + shift) % 256
+        noise = rng.integers(0, 16, (height, width, 1), dtype=np.uint8)
+        yield cv2.add(frame, np.repeat(noise, 3, axis=2))
+
+
+def video_frames(file_path, count):
+    video = cv2.VideoCapture(file_path)
+    try:
+        for _ in range(count):
+            success, image = video.read()
+            if not success:
+                break
+            yield image
+    finally:
+        video.release()
+
+
+def parse_size(size):
+    columns, lines = (int(value) for value in size.lower().split("x"))
+    return os.terminal_size((columns, lines))
+
+
+def run_case(frames, renderer, terminal, mode, sink):
+    # Pomiar czasu i bajtów bez śledzenia pamięci
+    geometry = FrameGeometry(mode, renderer.cell_size, terminal)
+    start = time.perf_counter()
+    for frame in frames:
+        sink.write(renderer.render_frame(geometry.resize(frame), geometry.margin))
+    elapsed = time.perf_counter() - start
+
+    return len(frames) / elapsed if elapsed > 0 else 0, renderer.bytes_per_frame()
+
+
+def measure_allocations(frames, renderer, terminal, mode, sink):
+    # Osobny przebieg, bo tracemalloc spowalnia renderowanie
+    geometry = FrameGeometry(mode, renderer.cell_size, terminal)
+    tracemalloc.start()
+    total = 0
+    try:
+        for frame in frames:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            sink.write(renderer.render_frame(geometry.resize(frame), geometry.margin))
+            total += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return total / len(frames) if frames else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark for the ASCII video renderer")
+    parser.add_argument("--video", help="Video file to take frames from (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=120, help="Number of frames per case")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="Terminal sizes as COLUMNSxLINES")
+    parser.add_argument("--palettes", nargs="+", default=list(palettes.keys()), choices=list(palettes.keys()), help="Palettes to test")
+    parser.add_argument("--glyph-modes", nargs="+", default=GLYPH_MODES, choices=GLYPH_MODES, help="Glyph modes to test")
+    parser.add_argument("--color-depths", nargs="+", default=COLOR_DEPTHS, choices=COLOR_DEPTHS, help="Color depths to test")
+    parser.add_argument("--outputs", nargs="+", default=list(OUTPUTS.keys()), choices=list(OUTPUTS.keys()), help="Output kinds to test")
+    parser.add_argument("--mode", type=int, default=2, choices=[1, 2], help="1 - maintain aspect ratio, 2 - use max terminal space")
+    parser.add_argument("--min-fps", type=float, help="Exit with an error if any case renders slower than this")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = list(video_frames(args.video, args.frames))
+    else:
+        frames = list(synthetic_frames(args.frames))
+
+    if not frames:
+        print("No frames to benchmark.")
+        return 1
+
+    # Paleta ma znaczenie tylko w trybie "Palette"
+    cases = []
+    for glyph_mode in args.glyph_modes:
+        for palette_choice in (args.palettes if glyph_mode == "Palette" else [args.palettes[0]]):
+            for color_depth in args.color_depths:
+                for output in args.outputs:
+                    for size in args.sizes:
+                        cases.append((glyph_mode, palette_choice if glyph_mode == "Palette" else "-", palette_choice, color_depth, output, size))
+
+    print(f"{'glyphs':<10} {'palette':<10} {'colors':<9} {'output':<6} {'size':<8} {'frames/s':>10} {'bytes/frame':>12} {'alloc KiB/frame':>16}")
+    slowest = None
+
+    with open(os.devnull, "wb") as sink:
+        for glyph_mode, palette_label, palette_choice, color_depth, output, size in cases:
+            terminal = parse_size(size)
+            palette = palettes[palette_choice]
+
+            fps, bytes_per_frame = run_case(frames, create_renderer(glyph_mode, palette, OUTPUTS[output], color_depth), terminal, args.mode, sink)
+            allocated = measure_allocations(frames, create_renderer(glyph_mode, palette, OUTPUTS[output], color_depth), terminal, args.mode, sink)
+
+            print(f"{glyph_mode:<10} {palette_label:<10} {color_depth:<9} {output:<6} {size:<8} {fps:>10.1f} {bytes_per_frame:>12.0f} {allocated / 1024:>16.1f}")
+            slowest = fps if slowest is None else min(slowest, fps)
+
+    if args.min_fps is not None and slowest < args.min_fps:
+        print(f"Slowest case ({slowest:.1f} frames/s) is below the required {args.min_fps:.1f} frames/s.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
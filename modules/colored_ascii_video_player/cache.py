@@ -0,0 +1,142 @@
+import os
+import mmap
+import zlib
+import struct
+import hashlib
+import argparse
+import cv2
+from geometry import FrameGeometry
+from renderer import create_renderer, palettes, ASPECT_RATIO, GLYPH_MODES, COLOR_DEPTHS
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+# Nagłówek: magic, wersja, kolumny, wiersze, czas klatki, liczba klatek, pozycja indeksu, klucz
+MAGIC = b"ASCV"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHdIQ32s")
+# Wpis indeksu: pozycja danych, długość danych, znacznik czasu (s)
+INDEX_ENTRY = struct.Struct("<QId")
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.digest()
+
+
+def cache_key(video_hash, terminal, palette_choice, mode, glyph_mode, color_depth):
+    # Klucz obejmuje wszystko, od czego zależy wygląd wyrenderowanych klatek
+    key = hashlib.sha256(video_hash)
+    key.update(f"{terminal.columns}x{terminal.lines}".encode())
+    key.update("".join(palettes[palette_choice]).encode("utf-8"))
+    key.update(f"mode={mode};aspect={ASPECT_RATIO};glyphs={glyph_mode};colors={color_depth}".encode())
+    return key.digest()
+
+
+def cache_path(file_path, terminal, palette_choice, mode, glyph_mode="Palette", color_depth="truecolor", cache_dir=CACHE_DIR):
+    key = cache_key(hash_file(file_path), terminal, palette_choice, mode, glyph_mode, color_depth)
+    return os.path.join(cache_dir, key.hex() + ".ascv"), key
+
+
+def compile_video(file_path, terminal, palette_choice, mode, glyph_mode="Palette", color_depth="truecolor", cache_dir=CACHE_DIR):
+    output_path, key = cache_path(file_path, terminal, palette_choice, mode, glyph_mode, color_depth, cache_dir)
+    if os.path.exists(output_path):
+        return output_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = output_path + ".tmp"
+
+    video = cv2.VideoCapture(file_path)
+    renderer = create_renderer(glyph_mode, palettes[palette_choice], True, color_depth)
+    geometry = FrameGeometry(mode, renderer.cell_size, terminal)
+    fps = video.get(cv2.CAP_PROP_FPS)
+    frame_time = 1 / fps if fps > 0 else 1 / 30
+    index = []
+    last_pts = None
+
+    try:
+        with open(temp_path, "wb") as file:
+            file.write(b"\0" * HEADER.size)  # Nagłówek jest zapisywany na końcu
+
+            while True:
+                success, image = video.read()
+                if not success:
+                    break
+
+                pts = video.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if last_pts is not None and pts <= last_pts:
+                    pts = last_pts + frame_time
+                last_pts = pts
+
+                payload = zlib.compress(renderer.render_frame(geometry.resize(image), geometry.margin))
+                index.append((file.tell(), len(payload), pts))
+                file.write(payload)
+
+            index_offset = file.tell()
+            for entry in index:
+                file.write(INDEX_ENTRY.pack(*entry))
+
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, terminal.columns, terminal.lines, frame_time, len(index), index_offset, key))
+
+        # Plik pojawia się pod docelową nazwą dopiero po pełnym zapisie
+        os.replace(temp_path, output_path)
+    finally:
+        video.release()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return output_path
+
+
+class CachedVideo:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.columns, self.lines, self.frame_time, self.frame_count, index_offset, self.key = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a compiled ASCII video: {path}")
+
+        self.index_offset = index_offset
+
+    def frames(self):
+        for number in range(self.frame_count):
+            offset, length, pts = INDEX_ENTRY.unpack_from(self.data, self.index_offset + number * INDEX_ENTRY.size)
+            yield pts, zlib.decompress(self.data[offset:offset + length])
+
+    def end_sequence(self):
+        return f"\x1b[{self.lines + 1};1H".encode()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a video into a pre-rendered ASCII cache file")
+    parser.add_argument("video", help="Path to the video file")
+    parser.add_argument("--palette", default="Regular", choices=list(palettes.keys()), help="Palette to render with")
+    parser.add_argument("--glyph-mode", default="Palette", choices=GLYPH_MODES, help="Glyph mode to render with")
+    parser.add_argument("--color-depth", default="truecolor", choices=COLOR_DEPTHS, help="Output color depth")
+    parser.add_argument("--mode", type=int, default=2, choices=[1, 2], help="1 - maintain aspect ratio, 2 - use max terminal space")
+    parser.add_argument("--size", help="Terminal size as COLUMNSxLINES (default: current terminal)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Directory for compiled files")
+    args = parser.parse_args()
+
+    if args.size:
+        columns, lines = (int(value) for value in args.size.lower().split("x"))
+        terminal = os.terminal_size((columns, lines))
+    else:
+        terminal = os.get_terminal_size()
+
+    path = compile_video(args.video, terminal, args.palette, args.mode, args.glyph_mode, args.color_depth, args.cache_dir)
+    print(f"Compiled: {path}")
+
+
+if __name__ == "__main__":
+    main()
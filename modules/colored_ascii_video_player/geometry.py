@@ -0,0 +1,122 @@
+import os
+import time
+import signal
+import threading
+import cv2
+import numpy as np
+from renderer import ASPECT_RATIO
+
+# Licznik zmian rozmiaru terminala zwiększany przez SIGWINCH
+_terminal_generation = 0
+_resize_signal_installed = False
+
+# Bez SIGWINCH (np. Windows) rozmiar terminala jest sprawdzany co tyle sekund
+POLL_INTERVAL = 0.5
+
+
+def _on_terminal_resize(signum, frame):
+    global _terminal_generation
+    _terminal_generation += 1
+
+
+def install_resize_handler():
+    # Sygnały można rejestrować tylko z głównego wątku
+    global _resize_signal_installed
+    if hasattr(signal, "SIGWINCH") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGWINCH, _on_terminal_resize)
+        _resize_signal_installed = True
+    return _resize_signal_installed
+
+
+class FrameGeometry:
+    def __init__(self, mode, cell_size=(1, 1), terminal=None, buffers=1):
+        self.mode = mode
+        self.cell_size = cell_size
+        self.fixed_terminal = terminal
+        self.buffer_count = buffers
+
+        self.terminal = None
+        self.source_shape = None
+        self.generation = None
+        self.last_poll = 0
+
+        # Wynik planowania
+        self.size = None  # (szerokość, wysokość) w pikselach dla cv2.resize
+        self.rows = 0  # Wysokość klatki w wierszach terminala
+        self.interpolation = cv2.INTER_LINEAR
+        self.margin = 0  # Liczba pustych kolumn po lewej stronie
+        self.buffers = []
+        self.next_buffer = 0
+
+    def terminal_changed(self):
+        if self.fixed_terminal is not None:
+            return False
+        if _resize_signal_installed:
+            return self.generation != _terminal_generation
+
+        now = time.monotonic()
+        if now - self.last_poll < POLL_INTERVAL:
+            return False
+        self.last_poll = now
+        return os.get_terminal_size() != self.terminal
+
+    def update(self, source_shape):
+        # Przeliczenie tylko przy pierwszej klatce, zmianie źródła albo rozmiaru terminala
+        if self.size is not None and source_shape == self.source_shape and not self.terminal_changed():
+            return False
+
+        self.generation = _terminal_generation
+        self.terminal = self.fixed_terminal or os.get_terminal_size()
+        self.source_shape = source_shape
+        self.plan()
+        return True
+
+    def plan(self):
+        term_width = self.terminal.columns
+        term_height = self.terminal.lines
+
+        # Zaokrąglenie szerokości do liczby parzystej dla estetyki
+        if term_width % 2 != 0:
+            term_width -= 1
+
+        height, width = self.source_shape[:2]
+
+        # Obliczenia proporcji
+        original_ratio = width / height
+        width_ratio = term_width / width
+        height_ratio = term_height / height
+
+        if self.mode == 1:
+            width_ratio = height_ratio * original_ratio * ASPECT_RATIO
+
+        columns = max(1, round(width * width_ratio))
+        rows = max(1, round(height * height_ratio))
+
+        # Szerokie wideo z zachowanymi proporcjami nie może wyjść poza terminal
+        if columns > term_width:
+            rows = max(1, round(rows * term_width / columns))
+            columns = term_width
+
+        # Tryby o większej gęstości mają kilka pikseli na jedną komórkę terminala
+        cell_height, cell_width = self.cell_size
+        self.size = (columns * cell_width, rows * cell_height)
+        self.rows = rows
+        # INTER_AREA przy zmniejszaniu jest wielokrotnie wolniejsze, więc zostaje INTER_LINEAR
+        self.interpolation = cv2.INTER_LINEAR if self.size[0] <= width else cv2.INTER_CUBIC
+
+        # Wypełnianie pustym miejscem, jeśli trzeba
+        size_difference = term_width - columns
+        self.margin = size_difference // 2 if size_difference > 1 else 0
+
+        # Bufory docelowe dla cv2.resize, używane po kolei
+        self.buffers = [np.empty((self.size[1], self.size[0], 3), dtype=np.uint8) for _ in range(self.buffer_count)]
+        self.next_buffer = 0
+
+    def resize(self, img):
+        self.update(img.shape)
+
+        buffer = self.buffers[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % self.buffer_count
+        cv2.resize(img, self.size, dst=buffer, interpolation=self.interpolation)
+        return buffer
+
@@ -1,33 +1,24 @@
 import cv2
 import sys
-import os
 import time
 from colorama import Fore, Style, init
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+from renderer import create_renderer, palettes, GLYPH_MODES, COLOR_DEPTHS, detect_color_depth
+from geometry import FrameGeometry, install_resize_handler
+from scheduler import PresentationClock
 
 init()
 
-# Palety
-palettes = {
-    "Regular": ["#", "%", "?", "+", ":", "·", "·"],
-    "Inverse": ["·", "·", ":", "+", "%", "#", "#"],
-    "Grayscale": ["#", "@", "O", "o", ".", ":", "+"],
-    "Numbers": ["7", "6", "5", "4", "3", "2", "1", "0"],
-    "Oceanic": ["~", "O", "o", "-", ".", ":", "+"]
-}
-
 # ·  ·  ·  ·  #
 # Do zmiany:
 # - Multithreading
 # - Oczyszczenie kodu
 # ·  ·  ·  ·  #
 
-ASPECT_RATIO = 1.5  # Stosunek wysokości do szerokości czcionki
-
 class VideoPlayer:
-    def __init__(self, master):
+    def __init__(self, master, color_depth="auto"):
         self.master = master
         self.master.title("ASCII Video Player Settings")
         self.video_thread = None
@@ -36,6 +27,14 @@ class VideoPlayer:
         self.palette_combobox = ttk.Combobox(master, values=list(palettes.keys()))
         self.palette_combobox.set("Regular")
 
+        self.glyph_label = tk.Label(master, text="Select Glyph Mode:")
+        self.glyph_combobox = ttk.Combobox(master, values=GLYPH_MODES)
+        self.glyph_combobox.set("Palette")
+
+        self.color_label = tk.Label(master, text="Select Color Depth:")
+        self.color_combobox = ttk.Combobox(master, values=["auto"] + COLOR_DEPTHS)
+        self.color_combobox.set(color_depth)
+
         self.mode_label = tk.Label(master, text="Select Mode:")
         self.mode_combobox = ttk.Combobox(master, values=["Maintain aspect ratio", "Use max terminal space"])
         self.mode_combobox.set("Use max terminal space")
@@ -44,16 +43,27 @@ class VideoPlayer:
         self.file_entry = tk.Entry(master)
         self.start_button = tk.Button(master, text="Start", command=self.start_video)
 
+        self.delta_var = tk.BooleanVar(value=False)
+        self.delta_checkbox = tk.Checkbutton(master, text="Delta output (changed cells only)", variable=self.delta_var)
+
         self.palette_label.pack(pady=5)
         self.palette_combobox.pack(pady=5)
+        self.glyph_label.pack(pady=5)
+        self.glyph_combobox.pack(pady=5)
+        self.color_label.pack(pady=5)
+        self.color_combobox.pack(pady=5)
         self.mode_label.pack(pady=5)
         self.mode_combobox.pack(pady=5)
         self.file_label.pack(pady=5)
         self.file_entry.pack(pady=5, padx=5)
+        self.delta_checkbox.pack(pady=5)
         self.start_button.pack(pady=10)
 
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Zmiana rozmiaru terminala (SIGWINCH) wymusza ponowne planowanie geometrii klatki
+        install_resize_handler()
+
     def start_video(self):
         if self.video_thread and self.video_thread.is_alive():
             messagebox.showerror("Error", "Visualization is already running.")
@@ -61,6 +71,8 @@ class VideoPlayer:
 
         # Pobranie danych z interfejsu
         palette_choice = self.palette_combobox.get()
+        self.glyph_mode = self.glyph_combobox.get()
+        color_choice = self.color_combobox.get()
         mode_choice = self.mode_combobox.get()
         file_path = self.file_entry.get()
 
@@ -68,7 +80,19 @@ class VideoPlayer:
             tk.messagebox.showerror("Error", "Invalid palette selection")
             return
 
+        if self.glyph_mode not in GLYPH_MODES:
+            messagebox.showerror("Error", "Invalid glyph mode selection")
+            return
+
+        if color_choice != "auto" and color_choice not in COLOR_DEPTHS:
+            messagebox.showerror("Error", "Invalid color depth selection")
+            return
+
+        # Głębia kolorów z podpowiedzi środowiska albo z wyboru użytkownika
+        self.color_depth = detect_color_depth() if color_choice == "auto" else color_choice
+
         mode = 1 if mode_choice == "Maintain aspect ratio" else 2
+        self.delta_output = self.delta_var.get()
 
         # Uruchomienie wątku do odtwarzania wideo
         self.video_thread = threading.Thread(target=self.play_video, args=(file_path, palette_choice, mode))
@@ -78,20 +102,45 @@ class VideoPlayer:
         try:
             # Ustawienie źródła wideo
             video = cv2.VideoCapture(file_path)
+            self.renderer = create_renderer(self.glyph_mode, palettes[palette_choice], self.delta_output, self.color_depth)
+            self.geometry = FrameGeometry(mode, self.renderer.cell_size)
 
             fps = video.get(cv2.CAP_PROP_FPS)
             frame_time = 1 / fps
 
+            # Zegar prezentacji oparty na znacznikach czasu klatek
+            clock = PresentationClock(frame_time)
+            clock.start()
+
             while True:
-                success, image = video.read()
+                if not video.grab():
+                    break
 
-                if success:
-                    self.print_frame(image, frame_time, palettes[palette_choice], mode)
-                else:
+                pts = clock.timestamp(video.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+
+                # Pomijanie klatek, gdy odtwarzanie nie nadąża
+                if clock.is_late(pts):
+                    clock.drop()
+                    continue
+
+                success, image = video.retrieve()
+                if not success:
                     break
 
+                clock.wait(pts)
+                render_start = time.monotonic()
+                self.print_frame(image)
+                clock.record_render(time.monotonic() - render_start)
+
+            clock.stop()
+
+            if self.delta_output:
+                sys.stdout.buffer.write(self.renderer.end_sequence())
+
             # Przywrócenie domyślnych kolorów terminala
             print("\x1b[0m")
+            print(f"Bytes per frame: {self.renderer.bytes_per_frame():.0f}")
+            print(clock.report())
             sys.stdout.flush()  # Wymuszenie opróżnienia bufora
 
         except Exception as e:
@@ -105,65 +154,22 @@ class VideoPlayer:
         else:
             self.master.destroy()
 
-    def grayscale(self, rgb):
-        r, g, b = map(int, rgb)
-        brightness = (r + g + b) / 3
-        return brightness
-
-    def print_frame(self, img, frame_time, palette, mode):
-        current_time = time.time()
-
-        # Znajdź rozmiary terminala
-        terminal = os.get_terminal_size()
-        term_width = terminal.columns
-        term_height = terminal.lines
-
-        # Zaokrąglenie szerokości do liczby parzystej dla estetyki
-        if term_width % 2 != 0:
-            term_width -= 1
-
-        height, width, _ = img.shape
-
-        # Obliczenia proporcji
-        original_ratio = width / height
-        width_ratio = term_width / width
-        height_ratio = term_height / height
-
-        if mode == 1:
-            width_ratio = height_ratio * original_ratio * ASPECT_RATIO
-            small_img = cv2.resize(img, (0, 0), fx=width_ratio, fy=height_ratio)
-        elif mode == 2:
-            small_img = cv2.resize(img, (0, 0), fx=width_ratio, fy=height_ratio)
-
-        small_height, small_width, _ = small_img.shape
+    def print_frame(self, img):
+        small_img = self.geometry.resize(img)
 
         # Krok przemieszczania klatki
-        frame_step = small_height + 1
-
-        # Wypełnianie pustym miejscem, jeśli trzeba
-        size_difference = term_width - small_width
-        if size_difference > 1:
-            padding = " " * (size_difference // 2 + 1)
-            small_img = cv2.putText(small_img, padding, (0, 0), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
+        frame_step = self.geometry.rows + 1
 
         # Rysowanie klatki
-        ascii_frame = ""
-        for col in small_img:
-            for row in col:
-                brightness = self.grayscale(row)
-                character = palette[int(brightness / 255 * (len(palette) - 1))]
-                ascii_frame += f'\x1b[38;2;{row[2]};{row[1]};{row[0]}m{character}'
-            ascii_frame += "\n"
+        ascii_frame = self.renderer.render_frame(small_img, self.geometry.margin)
 
-        print(ascii_frame[:-1], end="")
+        sys.stdout.flush()
+        sys.stdout.buffer.write(ascii_frame)
+        sys.stdout.buffer.flush()
 
         # Aktualizacja klatki
-        while True:
-            if time.time() - current_time <= frame_time:
-                pass
-            else:
-                sys.stdout.write(f"\033[{frame_step}F")  # Przesunięcie kursora w górę o n linii
-                break
+        if not self.delta_output:
+            sys.stdout.write(f"\033[{frame_step}F")  # Przesunięcie kursora w górę o n linii
 
 # Uruchomienie interfejsu
 root = tk.Tk()
@@ -0,0 +1,99 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
+import numpy as np
+from renderer import create_renderer
+
+# Stan procesu roboczego
+_renderer = None
+_attached = {}  # Numer slotu -> dołączony blok pamięci
+
+
+def _detach_all():
+    for shm in _attached.values():
+        shm.close()
+    _attached.clear()
+
+
+def _init_worker(glyph_mode, palette, color_depth):
+    global _renderer
+    _renderer = create_renderer(glyph_mode, palette, color_depth=color_depth)
+    # Zamknięcie bloków przy wyjściu procesu roboczego, także po shutdown() puli
+    util.Finalize(None, _detach_all, exitpriority=10)
+
+
+def _render_slot(index, name, shape, margin):
+    # Bloki pamięci tworzy i usuwa proces główny, tutaj są tylko dołączane
+    shm = _attached.get(index)
+    if shm is None or shm.name != name:
+        # Slot dostał nowy blok (np. po zmianie rozmiaru) - stare mapowanie jest zwalniane
+        if shm is not None:
+            shm.close()
+        shm = _attached[index] = shared_memory.SharedMemory(name=name)
+
+    img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    return _renderer.render_frame(img, margin)
+
+
+class ParallelRenderer:
+    def __init__(self, glyph_mode, palette, workers, color_depth="truecolor", depth=None):
+        self.workers = workers
+        self.cell_size = create_renderer(glyph_mode, palette).cell_size
+        self.depth = depth or workers * 2  # Liczba klatek renderowanych jednocześnie
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(glyph_mode, palette, color_depth))
+
+        self.slots = [shared_memory.SharedMemory(create=True, size=1) for _ in range(self.depth)]
+        self.free_slots = deque(range(self.depth))  # Numery wolnych slotów
+        self.pending = deque()  # Bufor przywracający kolejność: (pts, future, numer slotu, rows)
+
+        self.frames_rendered = 0
+        self.bytes_rendered = 0
+
+    def bytes_per_frame(self):
+        if self.frames_rendered == 0:
+            return 0
+        return self.bytes_rendered / self.frames_rendered
+
+    def in_flight(self):
+        return len(self.pending)
+
+    def is_full(self):
+        return not self.free_slots
+
+    def submit(self, pts, img, margin=0):
+        index = self.free_slots.popleft()
+        slot = self.slots[index]
+        if slot.size < img.nbytes:
+            # Zmiana rozmiaru terminala - większy blok pamięci
+            slot.close()
+            slot.unlink()
+            slot = self.slots[index] = shared_memory.SharedMemory(create=True, size=img.nbytes)
+
+        np.ndarray(img.shape, dtype=np.uint8, buffer=slot.buf)[:] = img
+        future = self.executor.submit(_render_slot, index, slot.name, img.shape, margin)
+        self.pending.append((pts, future, index, img.shape[0] // self.cell_size[0]))
+
+    def next_frame(self):
+        # Klatki są zwracane w kolejności wysłania, niezależnie od kolejności ukończenia
+        pts, future, index, rows = self.pending.popleft()
+        try:
+            ascii_frame = future.result()
+        finally:
+            self.free_slots.append(index)
+
+        self.frames_rendered += 1
+        self.bytes_rendered += len(ascii_frame)
+        return pts, ascii_frame, rows
+
+    def close(self):
+        for _, future, index, _ in self.pending:
+            future.cancel()
+            self.free_slots.append(index)
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+
+        for slot in self.slots:
+            slot.close()
+            slot.unlink()
+        self.slots.clear()
+        self.free_slots.clear()
@@ -0,0 +1,79 @@
+import threading
+import cv2
+
+
+class FrameRingBuffer:
+    def __init__(self, depth):
+        if depth < 1:
+            raise ValueError("Buffer depth must be at least 1")
+
+        self.depth = depth
+        self.slots = [None] * depth
+        self.head = 0  # Indeks najstarszej klatki w buforze
+        self.count = 0
+        self.closed = False
+        self.started = False
+        self.underruns = 0
+        self.condition = threading.Condition()
+
+    def put(self, frame):
+        # Blokuje producenta, dopóki w buforze nie zwolni się miejsce
+        with self.condition:
+            while self.count == self.depth and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return False
+
+            self.slots[(self.head + self.count) % self.depth] = frame
+            self.count += 1
+            self.condition.notify_all()
+            return True
+
+    def get(self):
+        # Zwraca None, gdy bufor został zamknięty i opróżniony
+        with self.condition:
+            if self.count == 0 and not self.closed and self.started:
+                self.underruns += 1  # Odtwarzanie czeka na dekoder
+            while self.count == 0 and not self.closed:
+                self.condition.wait()
+            if self.count == 0:
+                return None
+
+            frame = self.slots[self.head]
+            self.slots[self.head] = None
+            self.head = (self.head + 1) % self.depth
+            self.count -= 1
+            self.started = True
+            self.condition.notify_all()
+            return frame
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FrameDecoder(threading.Thread):
+    def __init__(self, video, buffer, geometry):
+        super().__init__(daemon=True)
+        self.video = video
+        self.buffer = buffer
+        self.geometry = geometry
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                success, image = self.video.read()
+                if not success:
+                    break  # Koniec pliku
+
+                # Znacznik czasu klatki (w sekundach) i margines są przekazywane razem z obrazem
+                pts = self.video.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                small_img = self.geometry.resize(image)
+                if not self.buffer.put((pts, small_img, self.geometry.margin)):
+                    break  # Odtwarzanie zostało przerwane
+        except Exception as e:
+            self.error = e
+        finally:
+            self.buffer.close()
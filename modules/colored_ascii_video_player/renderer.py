@@ -0,0 +1,316 @@
+import os
+import numpy as np
+
+# Palety
+palettes = {
+    "Regular": ["#", "%", "?", "+", ":", "·", "·"],
+    "Inverse": ["·", "·", ":", "+", "%", "#", "#"],
+    "Grayscale": ["#", "@", "O", "o", ".", ":", "+"],
+    "Numbers": ["7", "6", "5", "4", "3", "2", "1", "0"],
+    "Oceanic": ["~", "O", "o", "-", ".", ":", "+"]
+}
+
+ASPECT_RATIO = 1.5  # Stosunek wysokości do szerokości czcionki
+
+# Gotowe fragmenty kodu \x1b[38;2;R;G;Bm dla każdej wartości kanału
+RED_CODES = np.array([f"\x1b[38;2;{value};".encode() for value in range(256)], dtype=object)
+GREEN_CODES = np.array([f"{value};".encode() for value in range(256)], dtype=object)
+BLUE_CODES = np.array([f"{value}m".encode() for value in range(256)], dtype=object)
+BACKGROUND_RED_CODES = np.array([f"\x1b[48;2;{value};".encode() for value in range(256)], dtype=object)
+
+# Kody kolorów dla terminali 256- i 16-kolorowych
+FOREGROUND_256_CODES = np.array([f"\x1b[38;5;{index}m".encode() for index in range(256)], dtype=object)
+BACKGROUND_256_CODES = np.array([f"\x1b[48;5;{index}m".encode() for index in range(256)], dtype=object)
+FOREGROUND_16_CODES = np.array([f"\x1b[{30 + index if index < 8 else 82 + index}m".encode() for index in range(16)], dtype=object)
+BACKGROUND_16_CODES = np.array([f"\x1b[{40 + index if index < 8 else 92 + index}m".encode() for index in range(16)], dtype=object)
+
+# Domyślne kolory RGB podstawowej palety xterm
+ANSI_16_COLORS = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0), (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0), (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255)
+]
+
+COLOR_DEPTHS = ["truecolor", "256", "16"]
+_color_luts = {}
+
+# Wagi kropek znaku Braille'a dla pikseli komórki 4x2 (wierszami)
+BRAILLE_WEIGHTS = np.array([1, 8, 2, 16, 4, 32, 64, 128], dtype=np.intp)
+
+
+def xterm_256_colors():
+    # Kolory 16-255: sześcian 6x6x6 i 24 odcienie szarości
+    levels = [0, 95, 135, 175, 215, 255]
+    colors = list(ANSI_16_COLORS)
+    colors += [(levels[r], levels[g], levels[b]) for r in range(6) for g in range(6) for b in range(6)]
+    colors += [(8 + 10 * step,) * 3 for step in range(24)]
+    return np.array(colors, dtype=np.int32)
+
+
+def color_lut(color_depth):
+    # Tablica 32x32x32 indeksowana (B>>3, G>>3, R>>3), zwraca numer najbliższego koloru terminala
+    if color_depth not in _color_luts:
+        if color_depth == "256":
+            # Pierwsze 16 kolorów zależy od motywu terminala, więc są pomijane
+            first = 16
+            candidates = xterm_256_colors()[first:]
+        else:
+            first = 0
+            candidates = np.array(ANSI_16_COLORS, dtype=np.int32)
+
+        levels = np.arange(32, dtype=np.int32) * 8 + 4
+        blue, green, red = np.meshgrid(levels, levels, levels, indexing="ij")
+
+        distance = np.zeros((32 * 32 * 32, len(candidates)), dtype=np.int32)
+        for channel, values in ((0, red), (1, green), (2, blue)):
+            distance += (values.reshape(-1, 1) - candidates[:, channel]) ** 2
+
+        _color_luts[color_depth] = (distance.argmin(axis=1) + first).astype(np.uint8).reshape(32, 32, 32)
+    return _color_luts[color_depth]
+
+
+def detect_color_depth(environ=None):
+    # Wybór głębi kolorów na podstawie zmiennych środowiskowych terminala
+    environ = os.environ if environ is None else environ
+    colorterm = environ.get("COLORTERM", "").lower()
+    term = environ.get("TERM", "").lower()
+
+    if colorterm in ("truecolor", "24bit") or "WT_SESSION" in environ:
+        return "truecolor"
+    if "256color" in term:
+        return "256"
+    if term:
+        return "16"
+    return "truecolor"  # Brak TERM (np. konsola Windows) - zachowanie jak dotychczas
+
+
+class CellRenderer:
+    cell_size = (1, 1)  # Liczba pikseli (wysokość, szerokość) na komórkę terminala
+
+    def __init__(self, delta=False, color_depth="truecolor"):
+        if color_depth not in COLOR_DEPTHS:
+            raise ValueError(f"Unsupported color depth: {color_depth}")
+
+        self.delta = delta
+        self.color_depth = color_depth
+        self.glyph_codes = None
+        # Tablica LUT liczona od razu (~90 ms), a nie przy pierwszej klatce
+        self.lut = None if color_depth == "truecolor" else color_lut(color_depth)
+
+        # Licznik bajtów do porównywania trybów wyjścia
+        self.frames_rendered = 0
+        self.bytes_rendered = 0
+        self.reset()
+
+    def reset(self):
+        # Stan ekranu po ostatniej klatce (tylko dla wyjścia różnicowego)
+        self.previous_glyphs = None
+        self.previous_colors = None
+        self.previous_margin = 0
+        self.positions = None
+        self.positions_key = None
+
+    def bytes_per_frame(self):
+        if self.frames_rendered == 0:
+            return 0
+        return self.bytes_rendered / self.frames_rendered
+
+    def count_frame(self, frame):
+        self.frames_rendered += 1
+        self.bytes_rendered += len(frame)
+        return frame
+
+    def end_sequence(self):
+        # Przesunięcie kursora pod ostatnią klatkę
+        if self.previous_glyphs is None:
+            return b""
+        return f"\x1b[{self.previous_glyphs.shape[0] + 1};1H\x1b[0m".encode()
+
+    def crop(self, img):
+        # Obcięcie klatki do pełnych komórek
+        cell_height, cell_width = self.cell_size
+        height, width, _ = img.shape
+        return img[:height - height % cell_height, :width - width % cell_width]
+
+    def map_cells(self, img):
+        # Zwraca indeksy znaków, kolory pierwszego planu i tła (albo None)
+        raise NotImplementedError
+
+    def color_columns(self, foreground, background):
+        # Kolejne fragmenty kodu koloru: tablica kodów i wartości dla każdej komórki
+        if self.color_depth != "truecolor":
+            return self.quantized_color_columns(foreground, background)
+
+        columns = [
+            (RED_CODES, foreground[:, :, 2]),
+            (GREEN_CODES, foreground[:, :, 1]),
+            (BLUE_CODES, foreground[:, :, 0])
+        ]
+        if background is not None:
+            columns += [
+                (BACKGROUND_RED_CODES, background[:, :, 2]),
+                (GREEN_CODES, background[:, :, 1]),
+                (BLUE_CODES, background[:, :, 0])
+            ]
+        return columns
+
+    def quantized_color_columns(self, foreground, background):
+        lut = self.lut
+        if self.color_depth == "256":
+            foreground_codes, background_codes = FOREGROUND_256_CODES, BACKGROUND_256_CODES
+        else:
+            foreground_codes, background_codes = FOREGROUND_16_CODES, BACKGROUND_16_CODES
+
+        columns = [(foreground_codes, lut[foreground[:, :, 0] >> 3, foreground[:, :, 1] >> 3, foreground[:, :, 2] >> 3])]
+        if background is not None:
+            columns.append((background_codes, lut[background[:, :, 0] >> 3, background[:, :, 1] >> 3, background[:, :, 2] >> 3]))
+        return columns
+
+    def render_frame(self, img, margin=0):
+        # margin - liczba pustych kolumn przed klatką (wyśrodkowanie)
+        glyphs, foreground, background = self.map_cells(self.crop(img))
+        columns = self.color_columns(foreground, background)
+
+        if self.delta:
+            return self.count_frame(self.encode_delta(glyphs, columns, margin))
+        return self.count_frame(self.encode_full(glyphs, columns, margin))
+
+    def encode_full(self, glyphs, columns, margin=0):
+        height, width = glyphs.shape
+        step = len(columns) + 1
+        start = 1 if margin else 0
+
+        # Każda komórka to fragmenty kodu koloru i znak, na końcu wiersza znak nowej linii
+        cells = np.empty((height, start + width * step + 1), dtype=object)
+        if margin:
+            cells[:, 0] = b"\x1b[0m" + b" " * margin
+        for offset, (codes, values) in enumerate(columns):
+            cells[:, start + offset:-1:step] = codes[values]
+        cells[:, start + step - 1:-1:step] = self.glyph_codes[glyphs]
+        cells[:, -1] = b"\n"
+        cells[-1, -1] = b""
+
+        return b"".join(cells.ravel().tolist())
+
+    def encode_delta(self, glyphs, columns, margin=0):
+        height, width = glyphs.shape
+        colors = np.stack([values for _, values in columns], axis=2)
+        prefix = b""
+
+        if self.positions_key != (glyphs.shape, margin):
+            self.positions_key = (glyphs.shape, margin)
+            self.positions = np.array(
+                [f"\x1b[{row + 1};{margin + col + 1}H".encode() for row in range(height) for col in range(width)],
+                dtype=object
+            )
+
+        if self.previous_glyphs is None or self.previous_glyphs.shape != glyphs.shape or self.previous_margin != margin:
+            # Nowy rozmiar klatki - czyszczenie ekranu i pełne odrysowanie
+            prefix = b"\x1b[0m\x1b[2J"
+            changed = np.ones(height * width, dtype=bool)
+        else:
+            changed = ((glyphs != self.previous_glyphs) | (colors != self.previous_colors).any(axis=2)).ravel()
+
+        self.previous_glyphs = glyphs
+        self.previous_colors = colors
+        self.previous_margin = margin
+
+        indices = np.flatnonzero(changed)
+        count = len(indices)
+        if count == 0:
+            return prefix
+
+        cell_colors = colors.reshape(-1, len(columns))[indices]
+
+        # Pozycja kursora tylko na początku serii sąsiadujących zmienionych komórek
+        run_start = np.ones(count, dtype=bool)
+        run_start[1:] = (indices[1:] != indices[:-1] + 1) | (indices[1:] % width == 0)
+
+        # Kod koloru tylko wtedy, gdy różni się od ostatnio wypisanego
+        color_change = np.ones(count, dtype=bool)
+        color_change[1:] = (cell_colors[1:] != cell_colors[:-1]).any(axis=1)
+        changed_colors = cell_colors[color_change]
+
+        cells = np.full((count, len(columns) + 2), b"", dtype=object)
+        cells[run_start, 0] = self.positions[indices[run_start]]
+        for offset, (codes, _) in enumerate(columns):
+            cells[color_change, offset + 1] = codes[changed_colors[:, offset]]
+        cells[:, -1] = self.glyph_codes[glyphs.ravel()[indices]]
+
+        return prefix + b"".join(cells.ravel().tolist())
+
+
+class FrameRenderer(CellRenderer):
+    def __init__(self, palette, delta=False, color_depth="truecolor", encoding="utf-8"):
+        super().__init__(delta, color_depth)
+        self.palette = palette
+        levels = len(palette) - 1
+
+        # Indeks znaku dla każdej możliwej sumy kanałów (0..765), liczony jak dawniej w grayscale()
+        self.glyph_lut = np.array([int(total / 3 / 255 * levels) for total in range(766)], dtype=np.intp)
+        self.glyph_codes = np.array([character.encode(encoding) for character in palette], dtype=object)
+
+    def map_frame(self, img):
+        # Zamiana całej klatki BGR na indeksy znaków palety
+        brightness = img.sum(axis=2, dtype=np.uint16)
+        return self.glyph_lut[brightness]
+
+    def map_cells(self, img):
+        return self.map_frame(img), img, None
+
+
+class HalfBlockRenderer(CellRenderer):
+    cell_size = (2, 1)
+
+    def __init__(self, delta=False, color_depth="truecolor", encoding="utf-8"):
+        super().__init__(delta, color_depth)
+        self.glyph_codes = np.array(["▀".encode(encoding)], dtype=object)
+
+    def map_cells(self, img):
+        # Górny piksel to kolor znaku, dolny to kolor tła
+        top = img[0::2]
+        bottom = img[1::2]
+        glyphs = np.zeros(top.shape[:2], dtype=np.intp)
+        return glyphs, top, bottom
+
+
+class BrailleRenderer(CellRenderer):
+    cell_size = (4, 2)
+
+    def __init__(self, delta=False, color_depth="truecolor", encoding="utf-8"):
+        super().__init__(delta, color_depth)
+        self.glyph_codes = np.array([chr(0x2800 + bits).encode(encoding) for bits in range(256)], dtype=object)
+
+    def map_cells(self, img):
+        height, width, _ = img.shape
+        rows, cols = height // 4, width // 2
+
+        # Piksele każdej komórki 4x2 ułożone obok siebie: (wiersz, kolumna, 8, 3)
+        pixels = img.reshape(rows, 4, cols, 2, 3).transpose(0, 2, 1, 3, 4).reshape(rows, cols, 8, 3)
+        brightness = pixels.sum(axis=3, dtype=np.uint16)
+        mean = brightness.mean(axis=2)
+
+        # Kropka jest zapalona, gdy piksel jest jaśniejszy od średniej komórki
+        lit = brightness > mean[:, :, None]
+        # Jednolite, jasne komórki zapalają wszystkie kropki
+        lit[~lit.any(axis=2) & (mean >= 383)] = True
+
+        glyphs = (lit * BRAILLE_WEIGHTS).sum(axis=2)
+
+        # Kolor znaku to średnia zapalonych pikseli (albo całej komórki, gdy żaden nie świeci)
+        lit_count = lit.sum(axis=2)[:, :, None]
+        lit_sum = (pixels * lit[:, :, :, None]).sum(axis=2, dtype=np.uint32)
+        foreground = np.where(lit_count > 0, lit_sum // np.maximum(lit_count, 1), pixels.mean(axis=2)).astype(np.uint8)
+
+        return glyphs, foreground, None
+
+
+# Tryby rysowania dostępne w interfejsie
+GLYPH_MODES = ["Palette", "Half-block", "Braille"]
+
+
+def create_renderer(glyph_mode, palette, delta=False, color_depth="truecolor"):
+    if glyph_mode == "Half-block":
+        return HalfBlockRenderer(delta, color_depth)
+    if glyph_mode == "Braille":
+        return BrailleRenderer(delta, color_depth)
+    return FrameRenderer(palette, delta, color_depth)
@@ -0,0 +1,69 @@
+import time
+
+
+class PresentationClock:
+    def __init__(self, frame_time, speed=1.0):
+        self.frame_time = frame_time
+        self.speed = speed
+        self.start_time = None
+        self.end_time = None
+        self.last_pts = None
+        self.presented = 0
+        self.dropped = 0
+        self.render_latencies = []
+
+    def start(self):
+        self.start_time = time.monotonic()
+
+    def stop(self):
+        self.end_time = time.monotonic()
+
+    def timestamp(self, pts):
+        # Niektóre źródła nie podają znaczników czasu - wtedy liczymy je z FPS
+        if self.last_pts is not None and pts <= self.last_pts:
+            pts = self.last_pts + self.frame_time
+        self.last_pts = pts
+        return pts
+
+    def due_in(self, pts):
+        # Czas (w sekundach) do momentu wyświetlenia klatki
+        return self.start_time + pts / self.speed - time.monotonic()
+
+    def is_late(self, pts):
+        # Klatka spóźniona o więcej niż jedną klatkę jest pomijana
+        return self.due_in(pts) < -self.frame_time / self.speed
+
+    def drop(self):
+        self.dropped += 1
+
+    def wait(self, pts):
+        delay = self.due_in(pts)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_render(self, latency):
+        self.presented += 1
+        self.render_latencies.append(latency)
+
+    def percentile(self, percent):
+        if not self.render_latencies:
+            return 0
+        latencies = sorted(self.render_latencies)
+        index = min(len(latencies) - 1, int(round(percent / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def effective_fps(self):
+        end_time = self.end_time if self.end_time is not None else time.monotonic()
+        elapsed = end_time - self.start_time if self.start_time is not None else 0
+        if elapsed <= 0:
+            return 0
+        return self.presented / elapsed
+
+    def report(self):
+        return (
+            f"Effective FPS: {self.effective_fps():.2f}\n"
+            f"Presented frames: {self.presented}\n"
+            f"Dropped frames: {self.dropped}\n"
+            f"Render latency (ms): p50 {self.percentile(50) * 1000:.1f}, "
+            f"p95 {self.percentile(95) * 1000:.1f}, p99 {self.percentile(99) * 1000:.1f}"
+        )
@@ -1,34 +1,31 @@
 import cv2
 import sys
 import os
+import math
 import time
 from colorama import Fore, Style, init
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import argparse
+from renderer import create_renderer, palettes, GLYPH_MODES, COLOR_DEPTHS, detect_color_depth
+from pipeline import FrameDecoder, FrameRingBuffer
+from geometry import FrameGeometry, install_resize_handler
+from scheduler import PresentationClock
+from parallel import ParallelRenderer
+from cache import CachedVideo, compile_video
 
 init()
 
-# Palety
-palettes = {
-    "Regular": ["#", "%", "?", "+", ":", "·", "·"],
-    "Inverse": ["·", "·", ":", "+", "%", "#", "#"],
-    "Grayscale": ["#", "@", "O", "o", ".", ":", "+"],
-    "Numbers": ["7", "6", "5", "4", "3", "2", "1", "0"],
-    "Oceanic": ["~", "O", "o", "-", ".", ":", "+"]
-}
-
 # ·  ·  ·  ·  #
 # Do zmiany:
-# - Multithreading
 # - Oczyszczenie kodu
 # ·  ·  ·  ·  #
 
-ASPECT_RATIO = 1.5  # Stosunek wysokości do szerokości czcionki
-
 class VideoPlayer:
-    def __init__(self, master):
+    def __init__(self, master, workers=0, color_depth="auto"):
         self.master = master
+        self.workers = workers
         self.master.title("ASCII Video Player Settings")
         self.video_thread = None
 
@@ -36,6 +33,14 @@ class VideoPlayer:
         self.palette_combobox = ttk.Combobox(master, values=list(palettes.keys()))
         self.palette_combobox.set("Regular")
 
+        self.glyph_label = tk.Label(master, text="Select Glyph Mode:")
+        self.glyph_combobox = ttk.Combobox(master, values=GLYPH_MODES)
+        self.glyph_combobox.set("Palette")
+
+        self.color_label = tk.Label(master, text="Select Color Depth:")
+        self.color_combobox = ttk.Combobox(master, values=["auto"] + COLOR_DEPTHS)
+        self.color_combobox.set(color_depth)
+
         self.mode_label = tk.Label(master, text="Select Mode:")
         self.mode_combobox = ttk.Combobox(master, values=["Maintain aspect ratio", "Use max terminal space"])
         self.mode_combobox.set("Use max terminal space")
@@ -44,22 +49,43 @@ class VideoPlayer:
         self.file_entry = tk.Entry(master)
         self.start_button = tk.Button(master, text="Start", command=self.start_video)
 
+        self.delta_var = tk.BooleanVar(value=False)
+        self.delta_checkbox = tk.Checkbutton(master, text="Delta output (changed cells only)", variable=self.delta_var)
+
+        self.cache_var = tk.BooleanVar(value=False)
+        self.cache_checkbox = tk.Checkbutton(master, text="Use pre-rendered cache", variable=self.cache_var)
+
         self.fps_label = tk.Label(master, text="FPS (Frames per Second):")
         self.fps_entry = tk.Entry(master)
         self.fps_entry.insert(0, "60")
 
+        self.buffer_label = tk.Label(master, text="Buffer Depth (frames):")
+        self.buffer_entry = tk.Entry(master)
+        self.buffer_entry.insert(0, "64")
+
         self.palette_label.pack(pady=5)
         self.palette_combobox.pack(pady=5)
+        self.glyph_label.pack(pady=5)
+        self.glyph_combobox.pack(pady=5)
+        self.color_label.pack(pady=5)
+        self.color_combobox.pack(pady=5)
         self.mode_label.pack(pady=5)
         self.mode_combobox.pack(pady=5)
         self.file_label.pack(pady=5)
         self.file_entry.pack(pady=5, padx=5)
         self.fps_label.pack(pady=5)
         self.fps_entry.pack(pady=5, padx=5)
+        self.buffer_label.pack(pady=5)
+        self.buffer_entry.pack(pady=5, padx=5)
+        self.delta_checkbox.pack(pady=5)
+        self.cache_checkbox.pack(pady=5)
         self.start_button.pack(pady=10)
 
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Zmiana rozmiaru terminala (SIGWINCH) wymusza ponowne planowanie geometrii klatki
+        install_resize_handler()
+
     def start_video(self):
         if self.video_thread and self.video_thread.is_alive():
             messagebox.showerror("Error", "Visualization is already running.")
@@ -67,121 +93,229 @@ class VideoPlayer:
 
         # Pobranie danych z interfejsu
         palette_choice = self.palette_combobox.get()
+        self.glyph_mode = self.glyph_combobox.get()
+        color_choice = self.color_combobox.get()
         mode_choice = self.mode_combobox.get()
         file_path = self.file_entry.get()
 
         try:
             self.fps = float(self.fps_entry.get())
+            # Odstęp między klatkami to 1 / FPS, więc zero, ujemne i nieskończone wartości są odrzucane
+            if not (self.fps > 0 and math.isfinite(self.fps)):
+                raise ValueError
         except ValueError:
             messagebox.showerror("Error", "Invalid FPS value")
             return
 
+        try:
+            self.buffer_depth = int(self.buffer_entry.get())
+            if self.buffer_depth < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Invalid buffer depth")
+            return
+
         if palette_choice not in palettes:
             tk.messagebox.showerror("Error", "Invalid palette selection")
             return
 
+        if self.glyph_mode not in GLYPH_MODES:
+            messagebox.showerror("Error", "Invalid glyph mode selection")
+            return
+
+        if color_choice != "auto" and color_choice not in COLOR_DEPTHS:
+            messagebox.showerror("Error", "Invalid color depth selection")
+            return
+
+        # Głębia kolorów z podpowiedzi środowiska albo z wyboru użytkownika
+        self.color_depth = detect_color_depth() if color_choice == "auto" else color_choice
+
         mode = 1 if mode_choice == "Maintain aspect ratio" else 2
+        self.delta_output = self.delta_var.get()
+        self.use_cache = self.cache_var.get()
+
+        if self.delta_output and self.workers > 0:
+            messagebox.showerror("Error", "Delta output is not available with parallel rendering")
+            return
 
         # Uruchomienie wątku do odtwarzania wideo
         self.video_thread = threading.Thread(target=self.play_video, args=(file_path, palette_choice, mode))
         self.video_thread.start()
 
     def play_video(self, file_path, palette_choice, mode):
+        if self.use_cache:
+            self.play_cached(file_path, palette_choice, mode)
+            return
+
+        video = cv2.VideoCapture(file_path)
+        buffer = FrameRingBuffer(self.buffer_depth)
+        if self.workers > 0:
+            self.renderer = ParallelRenderer(self.glyph_mode, palettes[palette_choice], self.workers, self.color_depth)
+        else:
+            self.renderer = create_renderer(self.glyph_mode, palettes[palette_choice], self.delta_output, self.color_depth)
+        # Bufor pierścieniowy, klatka w trakcie wyświetlania i klatka w trakcie dekodowania
+        geometry = FrameGeometry(mode, self.renderer.cell_size, buffers=self.buffer_depth + 2)
+        decoder = FrameDecoder(video, buffer, geometry)
+        clock = None
+
         try:
-            video = cv2.VideoCapture(file_path)
+            clock = PresentationClock(1 / self.fps)
+
+            # Dekoder zapełnia bufor w tle, odtwarzanie pobiera z niego gotowe klatki
+            decoder.start()
 
-            frames = []
-            while True:
-                success, image = video.read()
-                if not success:
-                    break  # Przerwanie pętli, jeśli nie ma więcej klatek
-                frames.append(image)
+            # Wybrane FPS skaluje natywne znaczniki czasu wideo
+            native_fps = video.get(cv2.CAP_PROP_FPS)
+            if native_fps > 0:
+                clock.frame_time = 1 / native_fps
+                clock.speed = self.fps / native_fps
+            clock.start()
 
-            frame_time = 1 / self.fps
+            if self.workers > 0:
+                self.play_frames_parallel(buffer, clock)
+            else:
+                self.play_frames(buffer, clock)
 
-            for image in frames:
-                start_time = time.time()
-                self.print_frame(image, frame_time, palettes[palette_choice], mode)
-                processing_time = time.time() - start_time
-                sleep_time = frame_time - processing_time
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+            if decoder.error:
+                raise decoder.error
 
         except Exception as e:
             print(f"An error occurred: {e}")
         finally:
+            if clock:
+                clock.stop()
+            buffer.close()
+            if self.workers > 0:
+                self.renderer.close()
+            if decoder.is_alive():
+                decoder.join()
             video.release()
+            if self.delta_output:
+                sys.stdout.buffer.write(self.renderer.end_sequence())
             print("\x1b[0m")
+            print(f"Buffer underruns: {buffer.underruns}")
+            print(f"Bytes per frame: {self.renderer.bytes_per_frame():.0f}")
+            if clock:
+                print(clock.report())
             sys.stdout.flush()
 
-    def on_close(self):
-        if self.video_thread and self.video_thread.is_alive():
-            messagebox.showinfo("Info", "Please wait for the visualization to finish.")
-        else:
-            self.master.destroy()
+    def play_cached(self, file_path, palette_choice, mode):
+        cached = None
+        clock = None
 
-    def grayscale(self, rgb):
-        r, g, b = map(int, rgb)
-        brightness = (r + g + b) / 3
-        return brightness
+        try:
+            # Kompilacja tylko przy pierwszym odtworzeniu dla danego terminala i palety
+            print("Preparing pre-rendered cache...")
+            path = compile_video(file_path, os.get_terminal_size(), palette_choice, mode, self.glyph_mode, self.color_depth)
+            cached = CachedVideo(path)
+
+            clock = PresentationClock(cached.frame_time, speed=self.fps * cached.frame_time)
+            clock.start()
+
+            # Klatki w pliku są kodowane różnicowo, więc żadna nie może zostać pominięta
+            for pts, ascii_frame in cached.frames():
+                clock.wait(pts)
+                render_start = time.monotonic()
+                sys.stdout.buffer.write(ascii_frame)
+                sys.stdout.buffer.flush()
+                clock.record_render(time.monotonic() - render_start)
 
-    def print_frame(self, img, frame_time, palette, mode):
-        current_time = time.time()
+        except Exception as e:
+            print(f"An error occurred: {e}")
+        finally:
+            if cached:
+                sys.stdout.buffer.write(cached.end_sequence())
+                cached.close()
+            print("\x1b[0m")
+            if clock:
+                clock.stop()
+                print(clock.report())
+            sys.stdout.flush()
+
+    def play_frames(self, buffer, clock):
+        while True:
+            item = buffer.get()
+            if item is None:
+                break  # Przerwanie pętli, jeśli nie ma więcej klatek
 
-        # Znajdź rozmiary terminala
-        terminal = os.get_terminal_size()
-        term_width = terminal.columns
-        term_height = terminal.lines
+            pts, small_img, margin = item
+            pts = clock.timestamp(pts)
 
-        # Zaokrąglenie szerokości do liczby parzystej dla estetyki
-        if term_width % 2 != 0:
-            term_width -= 1
+            # Pomijanie klatek, gdy odtwarzanie nie nadąża
+            if clock.is_late(pts):
+                clock.drop()
+                continue
 
-        height, width, _ = img.shape
+            clock.wait(pts)
+            render_start = time.monotonic()
+            self.print_frame(small_img, margin)
+            clock.record_render(time.monotonic() - render_start)
 
-        # Obliczenia proporcji
-        original_ratio = width / height
-        width_ratio = term_width / width
-        height_ratio = term_height / height
+    def play_frames_parallel(self, buffer, clock):
+        end_of_video = False
 
-        if mode == 1:
-            width_ratio = height_ratio * original_ratio * ASPECT_RATIO
-            small_img = cv2.resize(img, (0, 0), fx=width_ratio, fy=height_ratio)
-        elif mode == 2:
-            small_img = cv2.resize(img, (0, 0), fx=width_ratio, fy=height_ratio)
+        while True:
+            # Wysyłanie kolejnych klatek do procesów roboczych, dopóki są wolne bloki pamięci
+            while not end_of_video and not self.renderer.is_full():
+                item = buffer.get()
+                if item is None:
+                    end_of_video = True
+                    break
 
-        small_height, small_width, _ = small_img.shape
+                pts, small_img, margin = item
+                pts = clock.timestamp(pts)
+                if clock.is_late(pts):
+                    clock.drop()
+                    continue
 
-        # Krok przemieszczania klatki
-        frame_step = small_height + 1
+                self.renderer.submit(pts, small_img, margin)
 
-        # Wypełnianie pustym miejscem, jeśli trzeba
-        size_difference = term_width - small_width
-        if size_difference > 1:
-            padding = " " * (size_difference // 2 + 1)
-            small_img = cv2.putText(small_img, padding, (0, 0), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
+            if not self.renderer.in_flight():
+                break  # Wszystkie klatki zostały wyświetlone
 
+            render_start = time.monotonic()
+            pts, ascii_frame, rows = self.renderer.next_frame()
+
+            # Klatka mogła się spóźnić podczas renderowania
+            if clock.is_late(pts):
+                clock.drop()
+                continue
+
+            clock.wait(pts)
+            self.write_frame(ascii_frame, rows)
+            clock.record_render(time.monotonic() - render_start)
+
+    def on_close(self):
+        if self.video_thread and self.video_thread.is_alive():
+            messagebox.showinfo("Info", "Please wait for the visualization to finish.")
+        else:
+            self.master.destroy()
+
+    def print_frame(self, small_img, margin=0):
         # Rysowanie klatki
-        ascii_frame = ""
-        for col in small_img:
-            for row in col:
-                brightness = self.grayscale(row)
-                character = palette[int(brightness / 255 * (len(palette) - 1))]
-                ascii_frame += f'\x1b[38;2;{row[2]};{row[1]};{row[0]}m{character}'
-            ascii_frame += "\n"
+        ascii_frame = self.renderer.render_frame(small_img, margin)
+        self.write_frame(ascii_frame, small_img.shape[0] // self.renderer.cell_size[0])
+
+    def write_frame(self, ascii_frame, rows):
+        # Krok przemieszczania klatki
+        frame_step = rows + 1
 
-        print(ascii_frame[:-1], end="")
+        sys.stdout.flush()
+        sys.stdout.buffer.write(ascii_frame)
+        sys.stdout.buffer.flush()
 
         # Aktualizacja klatki
-        while True:
-            if time.time() - current_time <= frame_time:
-                pass
-            else:
-                sys.stdout.write(f"\033[{frame_step}F")  # Przesunięcie kursora w górę o n linii
-                break
-
-# Uruchomienie interfejsu
-root = tk.Tk()
-app = VideoPlayer(root)
-root.resizable(width=False, height=False)
-root.mainloop()
+        if not self.delta_output:
+            sys.stdout.write(f"\033[{frame_step}F")  # Przesunięcie kursora w górę o n linii
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Colored ASCII Video Player")
+    parser.add_argument("--workers", type=int, default=0, help="Number of rendering processes (0 renders in the playback thread)")
+    parser.add_argument("--color-depth", default="auto", choices=["auto"] + COLOR_DEPTHS, help="Output color depth (auto detects it from COLORTERM/TERM)")
+    args = parser.parse_args()
+
+    # Uruchomienie interfejsu
+    root = tk.Tk()
+    app = VideoPlayer(root, args.workers, args.color_depth)
+    root.resizable(width=False, height=False)
+    root.mainloop()
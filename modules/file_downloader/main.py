@@ -1,57 +1,86 @@
 import argparse
 import hashlib
 import os
-import requests
 import ctypes
+import threading
 from tqdm import tqdm
 from colorama import Fore, Style, init
+from segmented import SegmentedDownloader, DownloadCancelled
+from scheduler import DownloadScheduler
 
 init(autoreset=True)
 
 class FileDownloader:
-    def __init__(self, urls, file_names, output_dir, show_info, show_header_info, double_check, ignore_download_check, no_beep):
+    def __init__(self, urls, file_names, output_dir, show_info, show_header_info, double_check, ignore_download_check, no_beep, segments=4, workers=8, per_host=4, max_rate=None):
         self.urls = urls
-        self.file_names = file_names
+        self.file_names = file_names or []
         self.output_dir = output_dir
         self.show_info = show_info
         self.show_header_info = show_header_info
         self.double_check = double_check
         self.ignore_download_check = ignore_download_check
         self.no_beep = no_beep
+        self.segments = max(segments, 1)
+        # Several files at once, a few per host, over pooled keep-alive sessions with a shared bandwidth cap
+        self.scheduler = DownloadScheduler(workers, per_host, per_host * self.segments, max_rate)
+        self.bar = None
+        self.bar_lock = threading.Lock()
 
     def download_files(self):
+        jobs = []
         for i, url in enumerate(self.urls):
             file_name = self.file_names[i] if i < len(self.file_names) else os.path.basename(url)
-            save_path = os.path.join(self.output_dir, file_name)
-            self.download_file(url, save_path)
+            jobs.append((url, os.path.join(self.output_dir, file_name)))
+
+        # One bar for the whole batch; its total grows as the sizes become known
+        with tqdm(
+            desc=f"{Fore.CYAN}Downloading{Style.RESET_ALL}",
+            total=0,
+            unit='iB',
+            unit_scale=True,
+            unit_divisor=1024,
+        ) as self.bar:
+            try:
+                for url, save_path, error in self.scheduler.run(jobs, self.download_file):
+                    pass  # download_file reports its own errors
+            except KeyboardInterrupt:
+                tqdm.write(f"{Fore.YELLOW}Download interrupted. Partial files are kept and continue on the next run.{Style.RESET_ALL}")
+                return
+            finally:
+                self.scheduler.close()
         self.play_system_sound()
 
+    def on_start(self, total_size):
+        if total_size:
+            with self.bar_lock:
+                self.bar.total += total_size
+                self.bar.refresh()
+
+    def on_progress(self, count):
+        with self.bar_lock:
+            self.bar.update(count)
+
     def download_file(self, url, save_path):
         try:
-            response = requests.get(url, stream=True)
+            # Segments of servers that accept byte ranges are fetched in parallel, others in one stream
+            downloader = SegmentedDownloader(self.scheduler.sessions.get(url), self.segments, self.on_start, self.on_progress, self.scheduler.throttle, self.scheduler.cancelled)
+            downloader.download(url, save_path)
+
+            if self.show_info and downloader.resumed:
+                tqdm.write(f"{Fore.CYAN}Resumed {url} after {downloader.resumed} bytes from an earlier run{Style.RESET_ALL}")
+
             if self.show_header_info:
-                print(f"{Fore.YELLOW}Header Information: {response.headers}{Style.RESET_ALL}")
-
-            total_size = int(response.headers.get('content-length', 0))
-            chunk_size = 1024
-            with open(save_path, "wb") as file, tqdm(
-                desc=f"{Fore.CYAN}Downloading{Style.RESET_ALL}", 
-                total=total_size, 
-                unit='iB', 
-                unit_scale=True, 
-                unit_divisor=chunk_size, 
-            ) as bar:
-                for data in response.iter_content(chunk_size=chunk_size):
-                    size = file.write(data)
-                    bar.update(size)
+                tqdm.write(f"{Fore.YELLOW}Header Information: {downloader.headers}{Style.RESET_ALL}")
 
             if self.double_check:
                 self.perform_double_check(url, save_path)
 
             if self.show_info:
-                print(f"{Fore.GREEN}Downloaded {url} to {save_path}{Style.RESET_ALL}")
+                tqdm.write(f"{Fore.GREEN}Downloaded {url} to {save_path}{Style.RESET_ALL}")
+        except DownloadCancelled:
+            pass  # Reported once for the whole batch
         except Exception as e:
-            print(f"{Fore.RED}Error downloading {url}: {e}{Style.RESET_ALL}")
+            tqdm.write(f"{Fore.RED}Error downloading {url}: {e}{Style.RESET_ALL}")
 
     def perform_double_check(self, url, save_path):
         temp_save_path = save_path + ".tmp"
@@ -99,20 +128,37 @@ Options:
     -d, --double-check                  Perform a double download for file integrity check.
     -i, --ignore-download-check         Ignore the preliminary download check.
     -n, --no-beep                       Disable the beep sound after download completion.
+    -sg, --segments SEGMENTS            Parallel connections per file for servers accepting byte ranges. Default is 4.
+    -w, --workers WORKERS               Number of files downloaded at the same time. Default is 8.
+    -ph, --per-host PER_HOST            Number of files downloaded at the same time from one host. Default is 4.
+    -r, --max-rate MAX_RATE             Bandwidth cap for all downloads together, e.g. 500K or 2M (bytes per second).
     --gui                               Use GUI mode for input.
 
 {Fore.YELLOW}Examples:{Style.RESET_ALL}
     script.py --urls "http://example.com/file1.zip" "http://example.com/file2.zip" --file_names "file1.zip" "file2.zip"
     script.py --output "C:\\Users\\Your_Name\\Downloads" --show-info --urls "http://example.com/file1.zip"
+    script.py --workers 16 --per-host 2 --max-rate 5M --urls "http://example.com/a.zip" "http://mirror.example.org/b.zip"
     script.py --gui
     script.py --no-beep --urls "http://example.com/file1.zip"
 
 {Fore.RED}Note:{Style.RESET_ALL}
+    Files are downloaded to "<name>.part" and renamed when complete. An interrupted download keeps its
+    progress in "<name>.part.json" and continues on the next run, unless the file changed on the server.
     Ensure URLs are quoted if they contain special characters.
     The --gui option allows for interactive input but ignores other command line arguments.
     The --no-beep option is useful in environments where a beep sound is not desired."""
         print(help_text)
 
+def parse_rate(rate):
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    rate = rate.strip().upper()
+    if rate.endswith("/S"):
+        rate = rate[:-2]
+    rate = rate.rstrip("B")
+    if rate and rate[-1] in units:
+        return int(float(rate[:-1]) * units[rate[-1]])
+    return int(float(rate))
+
 def main():
     parser = argparse.ArgumentParser(description="File Downloader Script", add_help=False)
     parser.add_argument("-u", "--urls", nargs="+", help="URLs of the files to download")
@@ -123,6 +169,10 @@ def main():
     parser.add_argument("-d", "--double-check", action="store_true", help="Perform double check of downloaded file")
     parser.add_argument("-i", "--ignore-download-check", action="store_true", help="Ignore download check")
     parser.add_argument("-n", "--no-beep", action="store_true", help="No beep sound after download completion")
+    parser.add_argument("-sg", "--segments", type=int, default=4, help="Parallel connections per file when the server accepts byte ranges")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Number of files downloaded at the same time")
+    parser.add_argument("-ph", "--per-host", type=int, default=4, help="Number of files downloaded at the same time from one host")
+    parser.add_argument("-r", "--max-rate", type=parse_rate, help="Bandwidth cap for all downloads, in bytes per second (K, M and G suffixes allowed)")
     parser.add_argument("--gui", action="store_true", help="Use GUI mode for input")
     parser.add_argument("-h", "--help", action="store_true", help="Show help message and exit")
     args = parser.parse_args()
@@ -153,7 +203,11 @@ def main():
         show_header_info=args.show_header_info,
         double_check=args.double_check,
         ignore_download_check=args.ignore_download_check,
-        no_beep=args.no_beep
+        no_beep=args.no_beep,
+        segments=args.segments,
+        workers=args.workers,
+        per_host=args.per_host,
+        max_rate=args.max_rate
     )
     downloader.download_files()
 
@@ -0,0 +1,92 @@
+import os
+import json
+
+PART_SUFFIX = ".part"  # Data is downloaded here and renamed to the final name only when complete
+STATE_SUFFIX = ".json"  # Sidecar next to the .part file
+
+
+class ValidatorChanged(Exception):
+    # The file on the server is no longer the one the partial download belongs to
+    pass
+
+
+def merge_ranges(ranges):
+    # Sorted, non-overlapping half-open (start, end) ranges
+    merged = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(item) for item in merged]
+
+
+def strong_etag(etag):
+    # Weak validators ("W/...") may not be used with If-Range
+    return etag if etag and not etag.startswith("W/") else None
+
+
+class ResumeState:
+    def __init__(self, path, url, size, etag=None, last_modified=None, completed=()):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.completed = merge_ranges(completed)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            return cls(path, data["url"], data["size"], data.get("etag"), data.get("last_modified"), data.get("completed", ()))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # Missing or damaged: the download starts over
+
+    def matches(self, url, size, etag, last_modified):
+        # Only a strong ETag or a Last-Modified date can prove that the file is unchanged
+        if self.url != url or self.size != size:
+            return False
+        if strong_etag(self.etag) or strong_etag(etag):
+            return self.etag == etag
+        return self.last_modified is not None and self.last_modified == last_modified
+
+    def if_range(self):
+        return strong_etag(self.etag) or self.last_modified
+
+    def completed_bytes(self):
+        return sum(end - start for start, end in self.completed)
+
+    def missing_ranges(self):
+        missing = []
+        position = 0
+        for start, end in self.completed:
+            if start > position:
+                missing.append((position, start))
+            position = max(position, end)
+        if position < self.size:
+            missing.append((position, self.size))
+        return missing
+
+    def save(self, in_progress=()):
+        # Written to a temporary file first, so a crash never leaves a half-written sidecar
+        data = {
+            "url": self.url,
+            "size": self.size,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "completed": merge_ranges(list(self.completed) + list(in_progress)),
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,120 @@
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+import requests.adapters
+
+
+def host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class TokenBucket:
+    # Bandwidth cap shared by every connection, in bytes per second
+    def __init__(self, rate, burst=None, cancelled=None):
+        self.rate = rate
+        self.capacity = burst or rate  # Up to one second of traffic may pass at full speed
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.cancelled = cancelled  # Event that cuts the wait short when the downloads are stopped
+
+    def consume(self, count):
+        # Takes the bytes right away and lets the balance go negative; the caller then sleeps
+        # until it is paid back, so concurrent callers queue up behind each other
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= count
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            if self.cancelled is not None:
+                self.cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+class SessionPool:
+    # One keep-alive session per host, so consecutive files reuse open connections
+    def __init__(self, connections_per_host):
+        self.connections_per_host = connections_per_host
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        key = host_key(url)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.connections_per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[key] = session
+            return session
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+
+class DownloadScheduler:
+    def __init__(self, workers=8, per_host=4, connections_per_host=None, max_rate=None):
+        self.workers = workers
+        self.per_host = per_host
+        self.sessions = SessionPool(connections_per_host or per_host)
+        self.cancelled = threading.Event()  # Set on Ctrl+C; running downloads check it for every block
+        self.bucket = TokenBucket(max_rate, cancelled=self.cancelled) if max_rate else None
+
+    def throttle(self, count):
+        if self.bucket:
+            self.bucket.consume(count)
+
+    def run(self, jobs, download):
+        # Runs download(url, save_path) for every (url, save_path) job and yields (url, save_path, error)
+        # as they finish. Jobs wait here rather than in the pool, so a busy host never blocks
+        # the workers that could serve other hosts.
+        waiting = {}  # Host -> jobs not started yet, in their original order
+        for job in jobs:
+            waiting.setdefault(host_key(job[0]), deque()).append(job)
+        active = {host: 0 for host in waiting}
+        running = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while waiting or running:
+                # Round-robin over hosts with a free slot until every worker is busy
+                started = True
+                while started and len(running) < self.workers:
+                    started = False
+                    for host in list(waiting):
+                        if len(running) >= self.workers:
+                            break
+                        if active[host] < self.per_host:
+                            url, save_path = waiting[host].popleft()
+                            if not waiting[host]:
+                                del waiting[host]
+                            active[host] += 1
+                            running[executor.submit(download, url, save_path)] = (host, url, save_path)
+                            started = True
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, url, save_path = running.pop(future)
+                    active[host] -= 1
+                    yield url, save_path, future.exception()
+        except BaseException:
+            # Ctrl+C or an abandoned generator: running downloads save their progress and return
+            self.cancelled.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self):
+        self.sessions.close()
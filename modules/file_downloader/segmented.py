@@ -0,0 +1,247 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from resume import ResumeState, ValidatorChanged, PART_SUFFIX, STATE_SUFFIX
+
+CHUNK_SIZE = 256 * 1024  # Bytes read from the socket per write
+MIN_SEGMENT_SIZE = 1024 * 1024  # Smaller files get fewer segments
+SEGMENT_RETRIES = 3  # A failed segment continues from the last byte written
+SAVE_INTERVAL = 2.0  # Seconds between updates of the resume sidecar
+REQUEST_TIMEOUT = 30
+
+# Ranges are byte offsets, so the server must not compress the body
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+class DownloadCancelled(Exception):
+    # The batch was stopped (Ctrl+C); whatever was written is kept for the next run
+    pass
+
+
+def plan_ranges(missing, segments):
+    # Half-open (start, end) ranges still to fetch; the largest ones are halved
+    # until there is one per connection, keeping every piece at least MIN_SEGMENT_SIZE
+    ranges = list(missing)
+    while ranges and len(ranges) < segments:
+        ranges.sort(key=lambda item: item[1] - item[0])
+        start, end = ranges[-1]
+        if end - start < 2 * MIN_SEGMENT_SIZE:
+            break
+        middle = (start + end) // 2
+        ranges[-1:] = [(start, middle), (middle, end)]
+    return sorted(ranges)
+
+
+def content_range_total(response):
+    match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+class RangeWriter:
+    # Writes blocks at their own offsets into a preallocated file, from any thread
+    def __init__(self, path, size):
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+        self.lock = None if hasattr(os, "pwrite") else threading.Lock()
+        os.ftruncate(self.fd, size)
+        if size and hasattr(os, "posix_fallocate"):
+            try:
+                # Reserves the blocks up front, so parallel writes do not fragment the file
+                os.posix_fallocate(self.fd, 0, size)
+            except OSError:
+                pass  # Not supported by every file system; the file is sparse then
+
+    def write_at(self, offset, data):
+        view = memoryview(data)
+        if self.lock is None:
+            while view:
+                written = os.pwrite(self.fd, view, offset)
+                offset += written
+                view = view[written:]
+        else:
+            # No pwrite on Windows: seek and write under a lock, since the file position is shared
+            with self.lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                while view:
+                    written = os.write(self.fd, view)
+                    view = view[written:]
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SegmentedDownloader:
+    def __init__(self, session, segments=4, on_start=None, on_progress=None, throttle=None, cancelled=None):
+        self.session = session
+        self.segments = segments
+        self.on_start = on_start  # Called with the total size (None if unknown) before any data arrives
+        self.on_progress = on_progress  # Called with the number of bytes written, from any thread
+        self.throttle = throttle  # Called with the size of every received block, may sleep to cap bandwidth
+        self.progress_lock = threading.Lock()
+        self.headers = None  # Headers of the probe request
+        self.failed = threading.Event()  # Stops the other segments once one has given up
+        self.cancelled = cancelled  # Event shared by the whole batch, set when the user stops it
+        self.save_lock = threading.Lock()
+        self.resumed = 0  # Bytes taken over from an earlier, interrupted run
+
+    def probe(self, url):
+        # HEAD tells the size, the validators and whether byte ranges are accepted without transferring the body
+        response = self.session.head(url, headers=IDENTITY, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+        self.headers = response.headers
+        if response.status_code >= 400:
+            return None, False
+        size = int(response.headers.get("Content-Length", 0)) or None
+        accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return size, accepts_ranges
+
+    def download(self, url, save_path, restart_on_change=True):
+        # Data goes to a .part file that only gets the final name once every byte is there
+        part_path = save_path + PART_SUFFIX
+        size, accepts_ranges = self.probe(url)
+        if not (accepts_ranges and size):
+            self.download_stream(url, part_path)
+            os.replace(part_path, save_path)
+            return
+
+        etag = self.headers.get("ETag")
+        last_modified = self.headers.get("Last-Modified")
+        state = ResumeState.load(part_path + STATE_SUFFIX)
+        if state is None or not state.matches(url, size, etag, last_modified) or not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+            self.discard(part_path)
+            state = ResumeState(part_path + STATE_SUFFIX, url, size, etag, last_modified)
+        try:
+            self.download_ranges(url, part_path, state)
+        except ValidatorChanged:
+            # The file changed on the server during the download: start over once
+            if not restart_on_change:
+                raise
+            self.discard(part_path)
+            self.failed.clear()
+            self.download(url, save_path, restart_on_change=False)
+            return
+        os.replace(part_path, save_path)
+        state.remove()
+
+    @staticmethod
+    def discard(part_path):
+        for path in (part_path, part_path + STATE_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def stopping(self):
+        # A cancelled batch stops the segments the same way a failed segment does
+        if self.is_cancelled():
+            self.failed.set()
+        return self.failed.is_set()
+
+    def report(self, count):
+        if self.on_progress:
+            with self.progress_lock:
+                self.on_progress(count)
+
+    def download_stream(self, url, part_path):
+        # Without byte ranges there is nothing to resume from, so this always starts at zero
+        with self.session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            expected = int(response.headers.get("Content-Length", 0)) or None
+            if self.on_start:
+                self.on_start(expected)
+            received = 0
+            with open(part_path, "wb") as file:
+                for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if self.is_cancelled():
+                        raise DownloadCancelled(url)
+                    if self.throttle:
+                        self.throttle(len(data))
+                    file.write(data)
+                    received += len(data)
+                    self.report(len(data))
+            if expected and received != expected and "Content-Encoding" not in response.headers:
+                raise IOError(f"Connection closed after {received} of {expected} bytes")
+
+    def download_ranges(self, url, part_path, state):
+        ranges = plan_ranges(state.missing_ranges(), self.segments)
+        self.resumed = state.completed_bytes()
+        if self.on_start:
+            self.on_start(state.size)
+        self.report(self.resumed)
+        if not ranges:
+            return  # Everything arrived in an earlier run that stopped just before the rename
+
+        self.positions = {start: start for start, end in ranges}  # Bytes written so far by each range
+        self.last_save = time.monotonic()
+        writer = RangeWriter(part_path, state.size)
+        try:
+            state.save()
+            with ThreadPoolExecutor(max_workers=min(len(ranges), self.segments)) as executor:
+                futures = [executor.submit(self.fetch_range, url, writer, state, start, end) for start, end in ranges]
+                try:
+                    for future in futures:
+                        future.result()  # Re-raises the first failed segment
+                except BaseException:
+                    self.failed.set()
+                    if not self.is_cancelled():
+                        raise
+            if self.is_cancelled():
+                # Segments return early once cancelled, so the file must not be renamed
+                raise DownloadCancelled(url)
+        finally:
+            # Whatever was written survives for the next run, even after a failure or Ctrl+C
+            self.save_state(writer, state)
+            writer.close()
+
+    def save_state(self, writer, state):
+        # Data is flushed to disk before the sidecar claims it
+        positions = list(self.positions.items())
+        writer.sync()
+        state.save(positions)
+
+    def fetch_range(self, url, writer, state, start, end):
+        position = start
+        for attempt in range(SEGMENT_RETRIES):
+            try:
+                headers = dict(IDENTITY, Range=f"bytes={position}-{end - 1}")
+                if state.if_range():
+                    headers["If-Range"] = state.if_range()
+                with self.session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    if response.status_code == 200 and "If-Range" in headers:
+                        raise ValidatorChanged(url)
+                    # 200 would mean the whole file is coming, which cannot be written at this offset
+                    if response.status_code != 206 or content_range_total(response) != state.size:
+                        raise IOError(f"Server did not honour the range request (HTTP {response.status_code})")
+                    for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if self.stopping():
+                            return
+                        data = data[:end - position]
+                        if self.throttle:
+                            self.throttle(len(data))
+                        writer.write_at(position, data)
+                        position += len(data)
+                        self.positions[start] = position
+                        self.report(len(data))
+                        if time.monotonic() - self.last_save >= SAVE_INTERVAL and self.save_lock.acquire(blocking=False):
+                            try:
+                                self.last_save = time.monotonic()
+                                self.save_state(writer, state)
+                            finally:
+                                self.save_lock.release()
+                        if position >= end:
+                            break
+                if position >= end:
+                    return
+                raise IOError(f"Connection closed at byte {position} of segment {start}-{end - 1}")
+            except IOError:
+                # requests' exceptions are IOErrors too
+                if attempt == SEGMENT_RETRIES - 1 or self.stopping():
+                    self.failed.set()
+                    raise
+            except ValidatorChanged:
+                self.failed.set()
+                raise
@@ -5,34 +5,115 @@ from hashlib import sha256
 from colorama import Fore, Style, init
 import os
 import sys
+import json
+import time
 
 init(autoreset=True)
 
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".json"
+SAVE_INTERVAL = 2.0  # Seconds between updates of the sidecar
+REQUEST_TIMEOUT = 30
+
+
+def strong_etag(etag):
+    # Weak validators ("W/...") may not be used with If-Range
+    return etag if etag and not etag.startswith("W/") else None
+
 class SimpleFileDownloader:
     def __init__(self, url, filename):
         self.url = url
         self.filename = filename
         self.tmp_filename = filename + ".tmp"
 
-    def download_file(self, filename):
+    def download_file(self, filename, allow_resume=True):
+        # Data goes to a .part file, renamed only once complete; the sidecar
+        # remembers how far it got and which version of the file it belongs to
+        part_filename = filename + PART_SUFFIX
+        state_filename = part_filename + STATE_SUFFIX
         try:
-            response = requests.get(self.url, stream=True)
-            total_size_in_bytes = int(response.headers.get('content-length', 0))
+            offset = 0
+            headers = {}
+            state = self.load_state(state_filename) if allow_resume else None
+            validator = state and (strong_etag(state.get("etag")) or state.get("last_modified"))
+            if validator and state.get("url") == self.url and os.path.exists(part_filename):
+                offset = min(state.get("completed", 0), os.path.getsize(part_filename))
+            if offset:
+                # If-Range: the server sends the whole file instead if it has changed since
+                headers = {"Range": f"bytes={offset}-", "If-Range": validator, "Accept-Encoding": "identity"}
+
+            response = requests.get(self.url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 416:
+                # The saved offset is past the end of the file, so it cannot be the same file
+                response.close()
+                self.remove_files(part_filename, state_filename)
+                return self.download_file(filename, allow_resume=False)
+            response.raise_for_status()
+            if response.status_code != 206 or not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                offset = 0  # Not resumable or changed on the server: start over
+            elif offset:
+                print(f"{Fore.CYAN}Resuming after {offset} bytes from an earlier run{Style.RESET_ALL}")
+
+            content_length = int(response.headers.get('content-length', 0))
+            total_size_in_bytes = offset + content_length if content_length else 0
+            state = {
+                "url": self.url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": total_size_in_bytes,
+                "completed": offset,
+            }
             block_size = 1024
-            progress_bar = tqdm(total=total_size_in_bytes, unit='iB', unit_scale=True)
-            with open(filename, 'wb') as file:
-                for data in response.iter_content(block_size):
-                    progress_bar.update(len(data))
-                    file.write(data)
+            progress_bar = tqdm(total=total_size_in_bytes, initial=offset, unit='iB', unit_scale=True)
+            last_save = time.monotonic()
+            with open(part_filename, 'r+b' if offset else 'wb') as file:
+                file.seek(offset)
+                file.truncate()
+                try:
+                    for data in response.iter_content(block_size):
+                        progress_bar.update(len(data))
+                        file.write(data)
+                        if time.monotonic() - last_save >= SAVE_INTERVAL:
+                            last_save = time.monotonic()
+                            self.save_state(state_filename, state, file)
+                finally:
+                    # Keeps whatever arrived, even when the connection breaks
+                    self.save_state(state_filename, state, file)
             progress_bar.close()
             if total_size_in_bytes != 0 and progress_bar.n != total_size_in_bytes:
                 print(f"{Fore.RED}ERROR: Something went wrong during the download{Style.RESET_ALL}")
                 return False
+            os.replace(part_filename, filename)
+            self.remove_files(state_filename)
             return True
         except Exception as e:
             print(f"{Fore.RED}An error occurred during the download: {e}{Style.RESET_ALL}")
             return False
 
+    @staticmethod
+    def load_state(state_filename):
+        try:
+            with open(state_filename, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def save_state(state_filename, state, file):
+        # The data is on disk before the sidecar claims it; the sidecar is replaced atomically
+        file.flush()
+        os.fsync(file.fileno())
+        state["completed"] = file.tell()
+        with open(state_filename + ".tmp", 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.replace(state_filename + ".tmp", state_filename)
+
+    @staticmethod
+    def remove_files(*filenames):
+        for filename in filenames:
+            if os.path.exists(filename):
+                os.remove(filename)
+
     def verify_file(self, filename):
         sha256_hash = sha256()
         with open(filename,"rb") as file:
@@ -76,6 +157,10 @@ class SimpleFileDownloader:
 {Fore.GREEN}--output{Style.RESET_ALL}      Filename to save the downloaded file as. {Fore.RED}(required){Style.RESET_ALL}
 {Fore.GREEN}--help{Style.RESET_ALL}        Show this help message and exit{Style.RESET_ALL}
 
+{Fore.CYAN}Resuming:{Style.RESET_ALL}
+The file is downloaded to <output>.part and renamed when complete. If the download is interrupted,
+running the same command again continues where it stopped, unless the file has changed on the server.
+
 {Fore.CYAN}Examples:{Style.RESET_ALL}
 {Fore.GREEN}main.py{Style.RESET_ALL} {Fore.LIGHTBLUE_EX}--url{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<file_url>{Style.RESET_ALL} {Fore.LIGHTBLUE_EX}--output{Style.RESET_ALL} {Fore.LIGHTMAGENTA_EX}<output_filename>{Style.RESET_ALL}
 {Fore.GREEN}main.py{Style.RESET_ALL} {Fore.LIGHTBLUE_EX}--help{Style.RESET_ALL}"""
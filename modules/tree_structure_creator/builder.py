@@ -0,0 +1,142 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_workers():
+    # Listing directories mostly waits on the disk, so more threads than cores pay off
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class TreeNode:
+    __slots__ = ("name", "path", "is_dir", "children", "error", "size", "mtime", "id", "parent", "waiting", "total_size", "total_files")
+
+    def __init__(self, name, path, is_dir, size=0, mtime=0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.children = None  # Entries in listing order, filled once the directory is scanned
+        self.error = None  # Set when the directory could not be listed
+        self.size = size  # File size in bytes, only collected when stats are requested
+        self.mtime = mtime  # Modification time in nanoseconds
+        self.id = None  # Position in a snapshot file
+        self.parent = None
+        self.waiting = 0  # Subdirectories not listed yet, used to add up totals bottom-up
+        self.total_size = 0  # Sizes and file counts of the whole subtree, once aggregated
+        self.total_files = 0
+
+
+class TreeBuilder:
+    def __init__(self, workers=None, with_stats=False):
+        self.workers = workers or default_workers()
+        self.with_stats = with_stats
+        self.events = queue.Queue()  # Progress and error messages for the main thread
+
+    def build(self, path, on_progress=None, on_error=None, on_listed=None):
+        # Lists every directory once with os.scandir, subdirectories in parallel.
+        # on_progress(discovered, completed), on_error(message) and on_listed(node) run on the calling thread;
+        # a directory is always reported as listed before any of its subdirectories
+        root = root_node(path, self.with_stats)
+        self.pending = 1  # Directories submitted but not listed yet
+        self.lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as self.executor:
+            self.executor.submit(self.scan_node, root, True)
+            while True:
+                kind, first, second = self.events.get()
+                if kind == "done":
+                    break
+                if kind == "progress" and on_progress:
+                    on_progress(first, second)
+                elif kind == "error" and on_error:
+                    on_error(first)
+                elif kind == "listed" and on_listed:
+                    on_listed(first)
+        return root
+
+    def scan_node(self, node, is_root=False):
+        subdirs = []
+        try:
+            subdirs = list_directory(node, self.report_error, self.with_stats)
+        finally:
+            self.events.put(("listed", node, None))
+            # Files are done once discovered, a directory once it has been listed
+            discovered = len(node.children or ())
+            self.events.put(("progress", discovered, discovered - len(subdirs) + (0 if is_root else 1)))
+            # Children are counted before they are submitted, so the count cannot reach zero early
+            with self.lock:
+                self.pending += len(subdirs) - 1
+                if self.pending == 0:
+                    self.events.put(("done", None, None))
+            for child in subdirs:
+                self.executor.submit(self.scan_node, child)
+
+    def report_error(self, message):
+        self.events.put(("error", message, None))
+
+
+def is_loop(parent_path, link_path):
+    # A link pointing at one of its own ancestors would be scanned forever
+    target = os.path.realpath(link_path)
+    parent = os.path.realpath(parent_path)
+    return parent == target or parent.startswith(target.rstrip(os.sep) + os.sep)
+
+
+def entry_stat(entry):
+    # Follows symlinks like is_dir(); broken links fall back to the link itself
+    try:
+        return entry.stat()
+    except OSError:
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+
+
+def root_node(path, with_stats=False):
+    node = TreeNode(os.path.basename(os.path.normpath(path)), path, True)
+    if with_stats:
+        try:
+            node.mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            pass
+    return node
+
+
+def list_directory(node, on_error, with_stats=False):
+    # Fills node.children and returns the subdirectories that still have to be listed
+    children = []
+    subdirs = []
+    try:
+        with os.scandir(node.path) as entries:
+            for entry in entries:
+                # is_dir() follows symlinks, the same as os.path.isdir
+                child = TreeNode(entry.name, entry.path, entry.is_dir())
+                child.parent = node
+                if with_stats:
+                    # One stat per entry, reused for sizes and times (free on Windows)
+                    stat_result = entry_stat(entry)
+                    if stat_result is not None:
+                        child.size = 0 if child.is_dir else stat_result.st_size
+                        child.mtime = stat_result.st_mtime_ns
+                children.append(child)
+                if child.is_dir:
+                    if entry.is_symlink() and is_loop(node.path, entry.path):
+                        child.children = []  # Shown, but not entered again
+                        on_error(f"Symlink loop skipped at {entry.path}\n")
+                    else:
+                        subdirs.append(child)
+    except PermissionError as e:
+        node.error = e
+        node.children = []
+        on_error(f"PermissionError accessing {node.path}: {e.strerror}\n")
+        return []
+    except OSError as e:
+        node.children = []
+        on_error(f"Error accessing {node.path}: {e.strerror}\n")
+        return []
+
+    node.children = children
+    node.waiting = len(subdirs)
+    return subdirs
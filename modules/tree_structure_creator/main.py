@@ -4,6 +4,10 @@ import argparse
 from colorama import Fore, Style, init, deinit
 import ctypes
 import re
+from builder import TreeBuilder, root_node
+from renderer import TreeRenderer, collected_children, live_children, WRITE_BUFFER_SIZE
+from totals import add_totals, directory_totals, format_size, limited_children, parse_size
+from snapshot import SnapshotRecorder, create_snapshot_writer, SNAPSHOT_FORMATS
 
 init(autoreset=True)
 
@@ -15,41 +19,51 @@ class TreeStructureCreator:
     def is_valid_file_name(file_name):
         return re.match(r'^[\w,\s-]+\.[A-Za-z]{3}$', file_name) is not None
 
-    def count_items(self, path):
-        total = 0
-        errors = 0
-
-        def log_error(e):
-            nonlocal errors
-            errors += 1
-            self.error_file.write(f"Error accessing {e.filename}: {e.strerror}\n")
-
-        for root, dirs, files in os.walk(path, onerror=log_error):
-            total += len(dirs) + len(files)
-            if not self.args.silent:
-                print(f"{Fore.CYAN}Scanned: {Fore.LIGHTBLUE_EX}{total}{Fore.CYAN} items (Errors: {Fore.LIGHTRED_EX}{errors}{Fore.CYAN}){Style.RESET_ALL}", end='\r')
-        return total, errors
-
-    def scan_directory(self, path, file, progress_bar, prefix=''):
-        try:
-            items = os.listdir(path)
-            for index, item in enumerate(items):
-                item_path = os.path.join(path, item)
-                is_last = index == len(items) - 1
-                tree_prefix = '└── ' if is_last else '├── '
-                new_prefix = '    ' if is_last else '│   '
-
-                if os.path.isdir(item_path):
-                    file.write(f"{prefix}{tree_prefix}{item}/\n")
-                    self.scan_directory(item_path, file, progress_bar, prefix + new_prefix)
-                else:
-                    file.write(f"{prefix}{tree_prefix}{item}\n")
-                progress_bar.update(1)
-
-        except PermissionError as e:
-            self.error_file.write(f"PermissionError accessing {path}: {e.strerror}\n")
-            file.write(f"{prefix}└── Access Denied\n")
-            progress_bar.update(1)
+    def stream_tree(self, recorder=None):
+        # Lists and writes one directory at a time; memory depends on the depth, not the tree size
+        root = root_node(self.args.path, recorder is not None)
+        if recorder:
+            recorder.add_root(root)
+        with tqdm.tqdm(total=0, unit="item", disable=self.args.silent) as pbar:
+            def on_directory(node):
+                if recorder:
+                    recorder.add_listing(node)
+                children = node.children or ()
+                pbar.total += len(children)
+                pbar.update(sum(1 for child in children if not child.is_dir) + (node is not root))
+
+            with open(self.args.output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as file:
+                TreeRenderer(file, on_directory, max_depth=self.args.max_depth).render(root, live_children(self.error_file.write, recorder is not None))
+        return root
+
+    def with_totals(self):
+        return self.args.sizes or self.args.min_size is not None or self.args.top_n_children is not None
+
+    def build_tree(self, recorder=None):
+        # Single pass: the progress total grows as directories are discovered
+        with_totals = self.with_totals()
+        with tqdm.tqdm(total=0, unit="item", disable=self.args.silent) as pbar:
+            def on_progress(discovered, completed):
+                pbar.total += discovered
+                pbar.update(completed)
+
+            def on_listed(node):
+                if recorder:
+                    if node.id is None:
+                        recorder.add_root(node)
+                    recorder.add_listing(node)
+                if with_totals:
+                    add_totals(node)
+
+            builder = TreeBuilder(self.args.workers, with_stats=recorder is not None or with_totals)
+            tree = builder.build(self.args.path, on_progress, self.error_file.write, on_listed if recorder or with_totals else None)
+
+        expand = collected_children
+        if self.args.min_size is not None or self.args.top_n_children is not None:
+            expand = limited_children(expand, self.args.min_size or 0, self.args.top_n_children)
+        with open(self.args.output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as file:
+            TreeRenderer(file, describe=directory_totals if with_totals else None, max_depth=self.args.max_depth).render(tree, expand)
+        return tree
 
     @staticmethod
     def play_system_sound(no_beep):
@@ -73,23 +87,35 @@ class TreeStructureCreator:
             print(f"{Fore.RED}Error: Error log file must have a .txt extension and a valid file name.{Style.RESET_ALL}")
             return
 
-        if not self.args.silent:
-            print(f"{Fore.BLUE}Starting scan...{Style.RESET_ALL}")
+        if self.args.snapshot and not self.args.snapshot.endswith(SNAPSHOT_FORMATS):
+            print(f"{Fore.RED}Error: Snapshot file must have a .jsonl or .tsnap extension.{Style.RESET_ALL}")
+            return
 
-        with open(self.args.error_log_file, 'w', encoding='utf-8') as self.error_file:
-            total_items, errors = self.count_items(self.args.path)
+        if self.args.stream and self.with_totals():
+            print(f"{Fore.RED}Error: Sizes, --min-size and --top-n-children need the whole tree and cannot be used with --stream.{Style.RESET_ALL}")
+            return
 
-            if not self.args.silent:
-                print(f"\n{Fore.GREEN}Total items to scan: {Fore.LIGHTGREEN_EX}{total_items}{Style.RESET_ALL}")
+        if not self.args.silent:
+            print(f"{Fore.BLUE}Starting scan...{Style.RESET_ALL}")
 
-            with open(self.args.output_file, 'w', encoding='utf-8') as file:
-                with tqdm.tqdm(total=total_items, unit="item", disable=self.args.silent) as pbar:
-                    self.scan_directory(self.args.path, file, pbar)
+        # Snapshot entries are written while directories are listed, not after the scan
+        recorder = SnapshotRecorder(create_snapshot_writer(self.args.snapshot)) if self.args.snapshot else None
+        try:
+            with open(self.args.error_log_file, 'w', encoding='utf-8') as self.error_file:
+                if self.args.stream:
+                    tree = self.stream_tree(recorder)
+                else:
+                    tree = self.build_tree(recorder)
+        finally:
+            if recorder:
+                recorder.close()
 
         if not self.args.silent:
             print(f"{Fore.GREEN}Scan completed!{Style.RESET_ALL}\n"
                   f"Structure saved in {Fore.LIGHTGREEN_EX}{self.args.output_file}{Style.RESET_ALL}\n"
                   f"Errors (if any) logged in {Fore.LIGHTGREEN_EX}{self.args.error_log_file}{Style.RESET_ALL}")
+            if self.with_totals():
+                print(f"Total: {Fore.LIGHTGREEN_EX}{format_size(tree.total_size)}{Style.RESET_ALL} in {tree.total_files} files")
             self.play_system_sound(self.args.no_beep)
             deinit()  # Deinitialize colorama
 
@@ -98,7 +124,7 @@ def show_help():
     print(f"\n{Fore.LIGHTMAGENTA_EX}Tree Structure Creator{Style.RESET_ALL}\n"
           "Scan a directory and create a detailed structure report.\n\n"
           "Usage:\n"
-          f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--path <path> [--output_file <output_file>] [--error_log_file <error_log_file>] [--silent] [--no_beep]{Style.RESET_ALL}\n"
+          f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--path <path> [--output_file <output_file>] [--error_log_file <error_log_file>] [--silent] [--no_beep] [--workers <count>] [--stream] [--snapshot <snapshot_file>]\n                 [--sizes] [--max-depth <depth>] [--min-size <size>] [--top-n-children <count>]{Style.RESET_ALL}\n"
           f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--gui{Style.RESET_ALL}\n\n"
           "Options:\n"
           f"  {Fore.LIGHTCYAN_EX}--path{Fore.WHITE}              Path of the directory to scan\n"
@@ -106,10 +132,20 @@ def show_help():
           f"  {Fore.LIGHTCYAN_EX}--error_log_file{Fore.WHITE}    File to log errors during scanning\n"
           f"  {Fore.LIGHTCYAN_EX}--silent{Fore.WHITE}            Run in silent mode (no prints or progress bar)\n"
           f"  {Fore.LIGHTCYAN_EX}--no_beep{Fore.WHITE}           Disable beep sound on completion\n"
+          f"  {Fore.LIGHTCYAN_EX}--workers{Fore.WHITE}           Number of threads scanning directories (default: CPU count + 4)\n"
+          f"  {Fore.LIGHTCYAN_EX}--stream{Fore.WHITE}            Write the tree while scanning, in one thread, with memory bounded by depth\n"
+          f"  {Fore.LIGHTCYAN_EX}--snapshot{Fore.WHITE}          Also save names, sizes and times (.jsonl or compact binary .tsnap)\n"
+          f"                      for snapshot.py to render, query or diff without scanning again\n"
+          f"  {Fore.LIGHTCYAN_EX}--sizes{Fore.WHITE}             Show the total size and file count of every directory\n"
+          f"  {Fore.LIGHTCYAN_EX}--max-depth{Fore.WHITE}         Only expand directories up to this depth (totals still cover everything)\n"
+          f"  {Fore.LIGHTCYAN_EX}--min-size{Fore.WHITE}          Hide entries smaller than this, e.g. 10M (implies --sizes)\n"
+          f"  {Fore.LIGHTCYAN_EX}--top-n-children{Fore.WHITE}    Show only the largest entries of each directory (implies --sizes)\n"
           f"  {Fore.LIGHTCYAN_EX}--gui{Fore.WHITE}               Use GUI mode to enter parameters\n"
           f"  {Fore.LIGHTCYAN_EX}--help{Fore.WHITE}              Show this help message and exit\n\n"
           "Examples:\n"
           f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--path \"C:\\Users\"{Style.RESET_ALL}\n"
+          f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--path \"C:\\Users\" --snapshot users.tsnap{Style.RESET_ALL}\n"
+          f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--path \"C:\\Users\" --max-depth 2 --min-size 100M --top-n-children 10{Style.RESET_ALL}\n"
           f"  {Fore.LIGHTGREEN_EX}python main.py {Fore.LIGHTCYAN_EX}--gui{Style.RESET_ALL}")
 
 def main():
@@ -122,6 +158,13 @@ def main():
     parser.add_argument("--error_log_file", default="error_log.txt", help="File to log errors during scanning")
     parser.add_argument("--silent", action="store_true", help="Run in silent mode (no prints or progress bar)")
     parser.add_argument("--no_beep", action="store_true", help="Disable beep sound on completion")
+    parser.add_argument("--stream", action="store_true", help="Write the tree while scanning, using memory bounded by the tree depth")
+    parser.add_argument("--workers", type=int, help="Number of threads scanning directories")
+    parser.add_argument("--snapshot", help="Snapshot file written during the scan (.jsonl or .tsnap)")
+    parser.add_argument("--sizes", action="store_true", help="Show the total size and file count of every directory")
+    parser.add_argument("--max_depth", "--max-depth", type=int, help="Only expand directories up to this depth")
+    parser.add_argument("--min_size", "--min-size", type=parse_size, help="Hide entries smaller than this size, e.g. 10M")
+    parser.add_argument("--top_n_children", "--top-n-children", type=int, help="Show only the N largest entries of each directory")
     parser.add_argument("--gui", action="store_true", help="Use GUI mode to enter parameters")
     parser.add_argument("--help", action="store_true", help="Show this help message and exit")
 
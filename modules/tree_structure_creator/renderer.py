@@ -0,0 +1,61 @@
+from builder import list_directory
+
+# Output is written in large blocks
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def collected_children(node):
+    # Children of a tree built beforehand; None means the directory could not be listed
+    return None if node.error is not None else node.children
+
+
+def live_children(on_error, with_stats=False):
+    # Lists directories only when the renderer reaches them, nothing is kept afterwards
+    def expand(node):
+        list_directory(node, on_error, with_stats)
+        return collected_children(node)
+    return expand
+
+
+class TreeRenderer:
+    def __init__(self, file, on_directory=None, describe=None, max_depth=None):
+        self.file = file
+        self.on_directory = on_directory  # Called with each expanded directory node
+        self.describe = describe  # Returns text appended to each directory line
+        self.max_depth = max_depth  # Directories deeper than this are shown but not expanded
+
+    def render(self, root, expand):
+        # Explicit stack instead of recursion: one frame per open directory level,
+        # holding its children, the next index and the line prefixes shared by all siblings
+        stack = []
+        self.push(stack, root, "", expand)
+        write = self.file.write
+        describe = self.describe
+        max_depth = self.max_depth
+
+        while stack:
+            frame = stack[-1]
+            children, index = frame[0], frame[1]
+            if index == len(children):
+                stack.pop()
+                continue
+            frame[1] = index + 1
+
+            child = children[index]
+            is_last = index == len(children) - 1
+            if child.is_dir:
+                write(f"{frame[3] if is_last else frame[2]}{child.name}/{describe(child) if describe else ''}\n")
+                # The stack holds one frame per level above the child
+                if max_depth is None or len(stack) < max_depth:
+                    self.push(stack, child, frame[5] if is_last else frame[4], expand)
+            else:
+                write(f"{frame[3] if is_last else frame[2]}{child.name}\n")
+
+    def push(self, stack, node, prefix, expand):
+        children = expand(node)
+        if self.on_directory:
+            self.on_directory(node)
+        if children is None:
+            self.file.write(f"{prefix}└── Access Denied\n")
+        elif children:
+            stack.append([children, 0, prefix + '├── ', prefix + '└── ', prefix + '│   ', prefix + '    '])
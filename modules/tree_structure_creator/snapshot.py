@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import struct
+import argparse
+from array import array
+from builder import TreeNode
+from renderer import TreeRenderer, collected_children, WRITE_BUFFER_SIZE
+
+# Entry kinds; "denied" marks a directory that could not be listed
+KIND_FILE = 0
+KIND_DIR = 1
+KIND_DENIED = 2
+KIND_NAMES = {KIND_FILE: "file", KIND_DIR: "dir", KIND_DENIED: "denied"}
+KIND_VALUES = {name: value for value, name in KIND_NAMES.items()}
+
+# Binary snapshot: header, then blocks of columns, then a block with zero entries.
+# Every block: entry count, parent ids, sizes, mtimes (int64), kinds (uint8), name lengths (uint32), names (UTF-8).
+# Entry ids are implicit: the position of the entry in the file
+MAGIC = b"TSNP"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+BLOCK_HEADER = struct.Struct("<I")
+BLOCK_ENTRIES = 65536
+
+SNAPSHOT_FORMATS = (".jsonl", ".tsnap")
+
+
+class JsonLinesSnapshotWriter:
+    def __init__(self, path):
+        # Names that are not valid UTF-8 are written back as their original bytes, like in .tsnap
+        self.file = open(path, "w", encoding="utf-8", errors="surrogateescape", buffering=WRITE_BUFFER_SIZE)
+        self.next_id = 0
+
+    def add(self, parent_id, name, kind, size, mtime):
+        entry_id = self.next_id
+        self.next_id += 1
+        self.file.write(json.dumps({"id": entry_id, "parent": parent_id, "name": name, "kind": KIND_NAMES[kind], "size": size, "mtime": mtime}, ensure_ascii=False))
+        self.file.write("\n")
+        return entry_id
+
+    def close(self):
+        self.file.close()
+
+
+class BinarySnapshotWriter:
+    def __init__(self, path):
+        self.file = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.next_id = 0
+        self.new_block()
+
+    def new_block(self):
+        self.parents = array("q")
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.kinds = array("B")
+        self.name_lengths = array("I")
+        self.names = bytearray()
+
+    def add(self, parent_id, name, kind, size, mtime):
+        encoded = name.encode("utf-8", "surrogateescape")
+        self.parents.append(parent_id)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.kinds.append(kind)
+        self.name_lengths.append(len(encoded))
+        self.names += encoded
+
+        entry_id = self.next_id
+        self.next_id += 1
+        if len(self.kinds) >= BLOCK_ENTRIES:
+            self.flush_block()
+        return entry_id
+
+    def flush_block(self):
+        # Only one block is held in memory, earlier ones are already on disk
+        self.file.write(BLOCK_HEADER.pack(len(self.kinds)))
+        for column in (self.parents, self.sizes, self.mtimes, self.kinds, self.name_lengths):
+            if sys.byteorder != "little":
+                column.byteswap()
+            self.file.write(column.tobytes())
+        self.file.write(self.names)
+        self.new_block()
+
+    def close(self):
+        if self.kinds:
+            self.flush_block()
+        self.file.write(BLOCK_HEADER.pack(0))
+        self.file.close()
+
+
+class SnapshotRecorder:
+    # Turns listed directories into snapshot entries while the scan is running
+    def __init__(self, writer):
+        self.writer = writer
+
+    def add_root(self, node):
+        node.id = self.writer.add(-1, node.path, KIND_DIR, 0, node.mtime)
+
+    def add_listing(self, node):
+        if node.error is not None:
+            self.writer.add(node.id, "", KIND_DENIED, 0, 0)
+            return
+        for child in node.children:
+            child.id = self.writer.add(node.id, child.name, KIND_DIR if child.is_dir else KIND_FILE, child.size, child.mtime)
+
+    def close(self):
+        self.writer.close()
+
+
+def create_snapshot_writer(path):
+    if path.endswith(".jsonl"):
+        return JsonLinesSnapshotWriter(path)
+    return BinarySnapshotWriter(path)
+
+
+def read_entries(path):
+    # Yields (id, parent id, name, kind, size, mtime) from either format
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as file:
+            for line in file:
+                record = json.loads(line)
+                yield record["id"], record["parent"], record["name"], KIND_VALUES[record["kind"]], record["size"], record["mtime"]
+        return
+
+    with open(path, "rb") as file:
+        magic, version = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a tree snapshot: {path}")
+
+        entry_id = 0
+        while True:
+            (count,) = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+            if count == 0:
+                break
+            columns = []
+            for typecode in ("q", "q", "q", "B", "I"):
+                column = array(typecode)
+                column.frombytes(file.read(count * column.itemsize))
+                if sys.byteorder != "little":
+                    column.byteswap()
+                columns.append(column)
+            parents, sizes, mtimes, kinds, name_lengths = columns
+            names = file.read(sum(name_lengths))
+
+            offset = 0
+            for index in range(count):
+                name = names[offset:offset + name_lengths[index]].decode("utf-8", "surrogateescape")
+                offset += name_lengths[index]
+                yield entry_id, parents[index], name, kinds[index], sizes[index], mtimes[index]
+                entry_id += 1
+
+
+def load_snapshot(path):
+    # Rebuilds the tree without touching the scanned file system
+    nodes = {}
+    root = None
+    for entry_id, parent_id, name, kind, size, mtime in read_entries(path):
+        if kind == KIND_DENIED:
+            nodes[parent_id].error = True
+            continue
+
+        parent = nodes.get(parent_id)
+        if parent is None:
+            # The root entry holds the scanned path instead of a name
+            node = TreeNode(os.path.basename(os.path.normpath(name)), name, True, size, mtime)
+        else:
+            node = TreeNode(name, os.path.join(parent.path, name), kind == KIND_DIR, size, mtime)
+        node.id = entry_id
+        if node.is_dir:
+            node.children = []
+            nodes[entry_id] = node
+        if parent is None:
+            root = node
+        else:
+            parent.children.append(node)
+    return root
+
+
+def flatten(root):
+    # Relative path -> (is_dir, size, mtime)
+    entries = {}
+    stack = [(root, "")]
+    while stack:
+        node, relative = stack.pop()
+        for child in node.children or ():
+            child_path = relative + child.name if not relative else relative + "/" + child.name
+            entries[child_path] = (child.is_dir, child.size, child.mtime)
+            if child.is_dir:
+                stack.append((child, child_path))
+    return entries
+
+
+def subtree_size(root, relative_path=""):
+    node = root
+    for part in filter(None, relative_path.replace("\\", "/").split("/")):
+        node = next((child for child in node.children or () if child.name == part), None)
+        if node is None:
+            raise KeyError(relative_path)
+
+    total_size = 0
+    total_files = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if not current.is_dir:
+            total_size += current.size
+            total_files += 1
+        else:
+            stack.extend(current.children or ())
+    return total_size, total_files
+
+
+def diff_snapshots(old_root, new_root):
+    old_entries = flatten(old_root)
+    new_entries = flatten(new_root)
+    added = sorted(path for path in new_entries if path not in old_entries)
+    removed = sorted(path for path in old_entries if path not in new_entries)
+    modified = sorted(path for path, entry in new_entries.items() if path in old_entries and not entry[0] and old_entries[path] != entry)
+    return added, removed, modified, old_entries, new_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render, query or compare tree snapshots without scanning again")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = commands.add_parser("render", help="Write the classic text view of a snapshot")
+    render_parser.add_argument("snapshot")
+    render_parser.add_argument("--output_file", help="File to write to (default: standard output)")
+
+    size_parser = commands.add_parser("size", help="Total size and file count of a subtree")
+    size_parser.add_argument("snapshot")
+    size_parser.add_argument("path", nargs="?", default="", help="Path relative to the scanned directory")
+
+    diff_parser = commands.add_parser("diff", help="Compare two snapshots")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "render":
+        root = load_snapshot(args.snapshot)
+        if args.output_file:
+            with open(args.output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as file:
+                TreeRenderer(file).render(root, collected_children)
+        else:
+            TreeRenderer(sys.stdout).render(root, collected_children)
+
+    elif args.command == "size":
+        total_size, total_files = subtree_size(load_snapshot(args.snapshot), args.path)
+        print(f"{args.path or '.'}: {total_size} bytes in {total_files} files")
+
+    elif args.command == "diff":
+        added, removed, modified, old_entries, new_entries = diff_snapshots(load_snapshot(args.old), load_snapshot(args.new))
+        for path in added:
+            print(f"+ {path}{'/' if new_entries[path][0] else ''}")
+        for path in removed:
+            print(f"- {path}{'/' if old_entries[path][0] else ''}")
+        for path in modified:
+            print(f"~ {path} ({old_entries[path][1]} -> {new_entries[path][1]} bytes)")
+        print(f"{len(added)} added, {len(removed)} removed, {len(modified)} modified")
+
+
+if __name__ == "__main__":
+    main()
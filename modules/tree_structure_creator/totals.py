@@ -0,0 +1,62 @@
+import re
+from builder import TreeNode
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(size_str):
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)B?\s*", size_str.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size_str}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def add_totals(node):
+    # Post-order aggregation during the scan, using the sizes already read while listing.
+    # Called once per listed directory, parents before children; a directory is final
+    # when its last subdirectory is, and then passes its totals up the tree
+    for child in node.children or ():
+        if not child.is_dir:
+            node.total_size += child.size
+            node.total_files += 1
+    while node.waiting == 0 and node.parent is not None:
+        parent = node.parent
+        parent.total_size += node.total_size
+        parent.total_files += node.total_files
+        parent.waiting -= 1
+        node = parent
+
+
+def entry_size(node):
+    return node.total_size if node.is_dir else node.size
+
+
+def directory_totals(node):
+    files = "file" if node.total_files == 1 else "files"
+    return f" ({format_size(node.total_size)}, {node.total_files} {files})"
+
+
+def limited_children(expand, min_size=0, top_n=None):
+    # Hides entries below min_size and keeps only the top_n largest ones, largest first;
+    # whatever is left out is summed up in a single line
+    def limited(node):
+        children = expand(node)
+        if not children:
+            return children
+        shown = [child for child in children if entry_size(child) >= min_size] if min_size else children
+        if top_n is not None and len(shown) > top_n:
+            shown = sorted(shown, key=entry_size, reverse=True)[:top_n]
+        hidden = len(children) - len(shown)
+        if hidden:
+            kept = set(map(id, shown))
+            hidden_size = sum(entry_size(child) for child in children if id(child) not in kept)
+            shown = shown + [TreeNode(f"... {hidden} more {'entry' if hidden == 1 else 'entries'} ({format_size(hidden_size)})", None, False)]
+        return shown
+    return limited